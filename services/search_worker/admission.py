@@ -0,0 +1,210 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from fastapi import HTTPException
+
+from observability import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)  # Highest first
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average with bursts of up to ``burst``"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class AdmissionController:
+    """Caps concurrent pipelines, queues the overflow by priority and rate-limits clients.
+
+    At most ``max_concurrent`` pipelines hold a slot. Further callers wait in a
+    FIFO queue per priority class, bounded to ``max_queue`` entries each; a
+    freed slot always goes to the oldest interactive waiter before any batch
+    waiter. A caller that finds its queue full is rejected immediately with 429
+    and a ``Retry-After`` estimated from recent pipeline durations; one that
+    waits longer than ``queue_timeout`` gets 503. Each client also has a token
+    bucket of ``client_burst`` requests refilled at ``client_rate_per_min``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 8,
+        max_queue: int = 32,
+        queue_timeout: Optional[float] = 30.0,
+        client_rate_per_min: float = 30.0,
+        client_burst: float = 10.0,
+        max_clients: int = 10000,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.client_rate = client_rate_per_min / 60.0
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.in_flight = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Exponentially weighted average pipeline duration, for Retry-After estimates
+        self._avg_service_secs = 5.0
+        self._waits: Dict[str, Deque[float]] = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected: Dict[str, int] = {}
+
+    def _reject(self, priority: str, reason: str, status_code: int, detail: str, retry_after: float):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        ADMISSION_REJECTED.labels(priority=priority, reason=reason).inc()
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def _queued_ahead(self, priority: str) -> int:
+        """Waiters that will be served before a new arrival of ``priority``"""
+        ahead = 0
+        for level in PRIORITIES:
+            ahead += len(self._queues[level])
+            if level == priority:
+                break
+        return ahead
+
+    def retry_after(self, priority: str = INTERACTIVE) -> float:
+        return self._avg_service_secs * (self._queued_ahead(priority) + 1) / self.max_concurrent
+
+    def check_rate(self, client_id: str, priority: str = INTERACTIVE):
+        """Charge one request to the client's token bucket, raising 429 when it is empty"""
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) >= self.max_clients:
+                self._prune_buckets()
+            bucket = self._buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+        wait = bucket.try_take()
+        if wait > 0:
+            self._reject(priority, "rate_limited", 429, "Rate limit exceeded for this client", wait)
+
+    def _prune_buckets(self):
+        # A full bucket carries no state worth keeping
+        now = time.monotonic()
+        for client_id in [c for c, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[client_id]
+
+    def check_capacity(self, priority: str = INTERACTIVE):
+        """Raise 429 now if a pipeline of ``priority`` would be turned away for a full queue"""
+        if self.in_flight >= self.max_concurrent and len(self._queues[priority]) >= self.max_queue:
+            self._reject(priority, "queue_full", 429, "Server is at capacity, retry later", self.retry_after(priority))
+
+    async def acquire(self, priority: str = INTERACTIVE, queue_timeout: Optional[float] = -1, bounded: bool = True):
+        """Wait for a pipeline slot.
+
+        ``queue_timeout=None`` waits indefinitely and -1 uses the default.
+        ``bounded=False`` skips the queue length limit, for internal work that
+        is already paced elsewhere.
+        """
+        if self.in_flight < self.max_concurrent and not any(self._queues.values()):
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            self._record_wait(priority, 0.0)
+            return
+
+        if bounded:
+            self.check_capacity(priority)
+        timeout = self.queue_timeout if queue_timeout == -1 else queue_timeout
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._queues[priority]
+        queue.append(waiter)
+        ADMISSION_QUEUE_DEPTH.labels(priority=priority).inc()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(priority, "queue_timeout", 503, f"Queued for more than {timeout}s, retry later", self.retry_after(priority))
+            raise
+        finally:
+            if waiter in queue:
+                queue.remove(waiter)
+            ADMISSION_QUEUE_DEPTH.labels(priority=priority).dec()
+        self.admitted[priority] += 1
+        self._record_wait(priority, time.monotonic() - started)
+
+    def release(self, service_secs: Optional[float] = None):
+        """Free a slot, handing it straight to the highest-priority waiter if there is one"""
+        if service_secs is not None:
+            self._avg_service_secs = 0.8 * self._avg_service_secs + 0.2 * service_secs
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    waiter.set_result(True)  # Slot ownership moves to the waiter
+                    return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: str = INTERACTIVE, queue_timeout: Optional[float] = -1, bounded: bool = True
+    ) -> AsyncIterator[None]:
+        await self.acquire(priority, queue_timeout, bounded)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def _record_wait(self, priority: str, wait: float):
+        self._waits[priority].append(wait)
+        ADMISSION_WAIT.labels(priority=priority).observe(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(samples: Deque[float], q: float) -> Optional[float]:
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queued": {priority: len(queue) for priority, queue in self._queues.items()},
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+            "wait_secs": {
+                priority: {"p50": percentile(waits, 0.5), "p95": percentile(waits, 0.95)}
+                for priority, waits in self._waits.items()
+            },
+            "avg_pipeline_secs": round(self._avg_service_secs, 3),
+            "tracked_clients": len(self._buckets),
+        }
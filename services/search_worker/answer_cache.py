@@ -0,0 +1,196 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from execution import BlockingExecutor
+from retrieval import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words that do not change what is being asked; question words are kept on purpose
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "at", "for", "by", "with", "from", "about", "into",
+    "is", "are", "was", "were", "be", "been", "being", "am", "do", "does", "did", "can", "could",
+    "should", "would", "will", "shall", "may", "might", "must",
+    "i", "me", "my", "we", "our", "you", "your", "it", "its", "this", "that", "these", "those",
+    "please", "tell", "explain", "some", "any", "there", "one", "get",
+}
+# Words that flip the meaning of a question; never dropped, so they are part of the matching key
+NEGATIONS = {"not", "no", "never", "without", "nor", "none", "cannot", "t"}  # "t" is what n't tokenizes to
+# Compare in tokenize's folded form ("this" -> "thi", "does" -> "doe")
+_STOPWORDS = set(tokenize(" ".join(STOPWORDS))) - NEGATIONS
+
+
+def normalize_query(query: str) -> str:
+    """Order-insensitive matching key: "How do I become a billionaire?" -> "become billionaire how".
+
+    Lowercases, drops punctuation and stopwords, folds plurals and sorts the
+    remaining distinct words. Numbers keep their original order after the
+    words, so "14 to 16" and "16 to 14" stay different questions.
+    """
+    tokens = [token for token in tokenize(query) if token not in _STOPWORDS] or tokenize(query)
+    words = sorted({token for token in tokens if not any(ch.isdigit() for ch in token)})
+    numbers = [token for token in tokens if any(ch.isdigit() for ch in token)]
+    return " ".join(words + numbers)
+
+
+class AnswerCache:
+    """Answer-level cache that also serves rewordings of earlier queries.
+
+    Queries are reduced to a normalized key (case, punctuation, stopwords,
+    plurals and word order removed; see ``normalize_query``) and a stored answer
+    is served only when the key and ``max_results`` match exactly. So "how to
+    become a billionaire" answers "How do I become a billionaire?", while
+    questions that differ in any content word, negation or number ("with
+    alcohol" / "with coffee", "safe" / "not safe", "14 to 16" / "16 to 14") are
+    looked up separately. Entries expire after ``ttl_secs`` and count their hits.
+
+    Answers live in SQLite (WAL) so all workers share them.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        executor: BlockingExecutor,
+        ttl_secs: float = 6 * 3600,
+        max_entries: int = 5000,
+    ):
+        self.db_path = db_path
+        self.executor = executor
+        self.ttl_secs = ttl_secs
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.hits = 0
+        self.bypassed = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS answers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    normalized_query TEXT NOT NULL,
+                    max_results INTEGER NOT NULL,
+                    query TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    last_hit_at REAL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_answers_created ON answers (created_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_answers_query ON answers (normalized_query, max_results)")
+            self._db.commit()
+
+    def _lookup(self, query: str, max_results: int) -> Optional[Dict[str, Any]]:
+        normalized = normalize_query(query)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, query, response, created_at FROM answers "
+                "WHERE normalized_query = ? AND max_results = ? AND created_at > ? ORDER BY id DESC LIMIT 1",
+                (normalized, max_results, time.time() - self.ttl_secs),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE answers SET hits = hits + 1, last_hit_at = ? WHERE id = ?", (time.time(), row[0]))
+            self._db.commit()
+        return {
+            "response": json.loads(row[2]),
+            "matched_query": row[1],
+            "age_secs": round(time.time() - row[3], 1),
+        }
+
+    def _put(self, query: str, max_results: int, response: Dict[str, Any]):
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            # A fresh answer replaces older ones for the same normalized query
+            self._db.execute("DELETE FROM answers WHERE normalized_query = ? AND max_results = ?", (normalized, max_results))
+            self._db.execute(
+                "INSERT INTO answers (normalized_query, max_results, query, response, created_at) VALUES (?, ?, ?, ?, ?)",
+                (normalized, max_results, query, json.dumps(response), now),
+            )
+            self._db.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl_secs,))
+            overflow = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._db.execute(
+                    "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY COALESCE(last_hit_at, created_at) LIMIT ?)",
+                    (overflow,),
+                )
+            self._db.commit()
+
+    def _entries(self, limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, query, normalized_query, max_results, created_at, hits, last_hit_at FROM answers "
+                "WHERE created_at > ? ORDER BY hits DESC, created_at DESC LIMIT ?",
+                (time.time() - self.ttl_secs, limit),
+            ).fetchall()
+            total = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return total, [
+            {
+                "id": row[0],
+                "query": row[1],
+                "normalized_query": row[2],
+                "max_results": row[3],
+                "created_at": row[4],
+                "hits": row[5],
+                "last_hit_at": row[6],
+            }
+            for row in rows
+        ]
+
+    def _clear(self) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM answers")
+            self._db.commit()
+        return cursor.rowcount
+
+    # Public API
+
+    async def get(self, query: str, max_results: int) -> Optional[Dict[str, Any]]:
+        """Stored answer for this query or a rewording of it, with match details; None on a miss"""
+        self.lookups += 1
+        try:
+            match = await self.executor.run(self._lookup, query, max_results)
+        except Exception as e:
+            logger.warning("Answer cache read failed", extra={"error": str(e)})
+            return None
+        if match:
+            self.hits += 1
+            logger.info("Answer cache hit", extra={"query": query, "matched_query": match["matched_query"]})
+        return match
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    async def put(self, query: str, max_results: int, response: Dict[str, Any]):
+        try:
+            await self.executor.run(self._put, query, max_results, response)
+        except Exception as e:
+            logger.warning("Answer cache write failed", extra={"error": str(e)})
+
+    async def clear(self) -> int:
+        return await self.executor.run(self._clear)
+
+    async def stats(self, top_entries: int = 20) -> Dict[str, Any]:
+        total, entries = await self.executor.run(self._entries, top_entries)
+        return {
+            "ttl_secs": self.ttl_secs,
+            "entries": total,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "top_entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
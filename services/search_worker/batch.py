@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from admission import BATCH, AdmissionController
+from cache import TwoLevelCache
+from execution import run_stage
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces calls evenly so they stay within a requests-per-minute budget"""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BatchJob:
+    """State and progress of one batch of research queries"""
+
+    def __init__(self, queries: List[Dict[str, Any]]):
+        self.id = uuid.uuid4().hex
+        self.queries = queries
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress = {
+            "queries": len(queries),
+            "searched": 0,
+            "unique_urls": 0,
+            "duplicate_urls_skipped": 0,
+            "crawled": 0,
+            "synthesized": 0,
+            "failed": 0,
+        }
+        self.results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        state = {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": dict(self.progress),
+        }
+        if include_results:
+            state["results"] = self.results
+        return state
+
+
+class BatchJobManager:
+    """Runs batches of research queries as background jobs.
+
+    A job searches every query, crawls the union of their URLs once through a
+    shared crawl function (so a URL that several queries found is fetched a
+    single time), then synthesizes each answer with Gemini calls paced by a
+    requests-per-minute budget and, when an admission controller is given,
+    holding a batch-priority pipeline slot so interactive requests are served
+    first. Job state is mirrored into the shared cache so any uvicorn worker
+    can answer status requests: progress under the job ID and each finished
+    result under its own key, so a progress update never rewrites the answers
+    gathered so far. Each synthesis runs under ``synthesis_timeout``.
+    """
+
+    def __init__(
+        self,
+        search: Callable[[str, int], Awaitable[List[str]]],
+        crawl: Callable[..., Awaitable[List[Dict[str, Any]]]],
+        synthesize: Callable[[str, List[Dict[str, Any]]], Awaitable[Dict[str, Any]]],
+        cache: TwoLevelCache,
+        synthesis_rpm: float,
+        search_concurrency: int = 8,
+        job_ttl_secs: float = 86400,
+        admission: Optional[AdmissionController] = None,
+        synthesis_timeout: Optional[float] = None,
+    ):
+        self.search = search
+        self.crawl = crawl
+        self.synthesize = synthesize
+        self.cache = cache
+        self.synthesis_limiter = RateLimiter(synthesis_rpm)
+        self.search_concurrency = search_concurrency
+        self.job_ttl_secs = job_ttl_secs
+        self.admission = admission
+        self.synthesis_timeout = synthesis_timeout
+        self._jobs: Dict[str, BatchJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, queries: List[Dict[str, Any]]) -> BatchJob:
+        job = BatchJob(queries)
+        self._jobs[job.id] = job
+        await self._publish(job)
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        self._prune()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if job_id in self._jobs:
+            return self._jobs[job_id].to_dict()
+        state = await self.cache.get("batch_job", job_id)
+        if state is None:
+            return None
+        state["results"] = await asyncio.gather(*(
+            self.cache.get("batch_result", f"{job_id}:{index}") for index in range(state["progress"]["queries"])
+        ))
+        return state
+
+    async def _publish(self, job: BatchJob):
+        """Mirror the job's status and counters (not its results) into the shared cache"""
+        await self.cache.set("batch_job", job.id, job.to_dict(include_results=False), self.job_ttl_secs)
+
+    async def _set_result(self, job: BatchJob, index: int, result: Dict[str, Any]):
+        job.results[index] = result
+        await self.cache.set("batch_result", f"{job.id}:{index}", result, self.job_ttl_secs)
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl_secs
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at and job.finished_at < cutoff:
+                del self._jobs[job_id]
+
+    async def _run(self, job: BatchJob):
+        job.status = "running"
+        job.started_at = time.time()
+        await self._publish(job)
+        try:
+            url_lists = await self._search_all(job)
+
+            # Dedupe URLs across the whole batch, keeping first-seen order
+            unique_urls = list(dict.fromkeys(url for urls in url_lists for url in urls))
+            job.progress["unique_urls"] = len(unique_urls)
+            job.progress["duplicate_urls_skipped"] = sum(len(urls) for urls in url_lists) - len(unique_urls)
+            logger.info("Batch URLs deduplicated", extra={"job_id": job.id, "unique_urls": len(unique_urls), "queries": len(job.queries)})
+            await self._publish(job)
+
+            def on_document(doc: Dict[str, Any]):
+                job.progress["crawled"] += 1
+
+            documents = await self.crawl(unique_urls, on_document=on_document) if unique_urls else []
+            documents_by_url = {doc["url"]: doc for doc in documents}
+            await self._publish(job)
+
+            await asyncio.gather(*(
+                self._synthesize_one(job, index, [documents_by_url[url] for url in urls if url in documents_by_url])
+                for index, urls in enumerate(url_lists)
+            ))
+            job.status = "completed"
+        except Exception as e:
+            logger.exception("Batch failed", extra={"job_id": job.id})
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            await self._publish(job)
+
+    async def _search_all(self, job: BatchJob) -> List[List[str]]:
+        slots = asyncio.Semaphore(self.search_concurrency)
+
+        async def search_one(index: int, request: Dict[str, Any]) -> List[str]:
+            async with slots:
+                try:
+                    urls = await self.search(request["query"], request["max_results"])
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    await self._set_result(job, index, {"query": request["query"], "error": f"Search failed: {detail}"})
+                    job.progress["failed"] += 1
+                    urls = []
+                job.progress["searched"] += 1
+                return urls
+
+        return await asyncio.gather(*(search_one(i, request) for i, request in enumerate(job.queries)))
+
+    async def _synthesize_one(self, job: BatchJob, index: int, documents: List[Dict[str, Any]]):
+        query = job.queries[index]["query"]
+        if job.results[index] is not None:
+            return  # Already failed at search time
+        if not documents:
+            await self._set_result(job, index, {"query": query, "error": "No content could be extracted from any URLs"})
+            job.progress["failed"] += 1
+            return
+        await self.synthesis_limiter.acquire()
+        try:
+            # Batch work waits behind interactive pipelines for as long as it takes; the
+            # limiter above already paces it, so it is not subject to the queue bound
+            async with self.admission.slot(BATCH, queue_timeout=None, bounded=False) if self.admission else nullcontext():
+                # A hung Gemini call must not hold the pipeline slot forever
+                result = await run_stage("synthesis", self.synthesize(query, documents), self.synthesis_timeout)
+            job.progress["synthesized"] += 1
+            await self._set_result(job, index, {
+                "query": query,
+                "answer": result["answer"],
+                "citations": result["citations"],
+                "sources": result["sources"],
+            })
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            job.progress["failed"] += 1
+            await self._set_result(job, index, {"query": query, "error": f"Synthesis failed: {detail}"})
+        await self._publish(job)
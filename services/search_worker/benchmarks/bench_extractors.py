@@ -0,0 +1,78 @@
+"""
+Micro-benchmark for the HTML extraction backends.
+
+Times every installed backend (selectolax, lxml, bs4) on the saved pages in
+benchmarks/fixtures plus one oversized page built from them, then measures how
+the process pool scales when many pages are extracted at once.
+
+    python benchmarks/bench_extractors.py --runs 20
+"""
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import ExtractionPool, available_extractors, extract_document
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixtures():
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    # An oversized page: every fixture repeated, as served by long-scroll sites
+    fixtures["oversized (x10)"] = b"".join(fixtures.values()) * 10
+    return fixtures
+
+
+def bench_backends(fixtures, runs):
+    print(f"{'fixture':<18} {'bytes':>9} {'backend':<11} {'median ms':>10} {'MB/s':>8} {'chars':>6}")
+    for name, html in fixtures.items():
+        for backend in available_extractors():
+            timings = []
+            document = None
+            for _ in range(runs):
+                started = time.perf_counter()
+                document = extract_document(f"fixture://{name}", html, backend)
+                timings.append(time.perf_counter() - started)
+            median = statistics.median(timings)
+            chars = len(document["content"]) if document else 0
+            print(f"{name:<18} {len(html):>9} {backend:<11} {median * 1000:>10.2f} {len(html) / median / 1e6:>8.1f} {chars:>6}")
+
+
+async def bench_pool(fixtures, pages, backend):
+    bodies = [html for name, html in fixtures.items() if not name.startswith("oversized")]
+    batch = [bodies[i % len(bodies)] for i in range(pages)]
+    print(f"\nExtracting {pages} pages concurrently")
+    for processes in sorted({0, 1, os.cpu_count() or 1}):
+        pool = ExtractionPool(backend, processes=processes)
+        # Warm the pool so process start-up isn't timed
+        await pool.extract("warmup://", batch[0])
+        started = time.perf_counter()
+        await asyncio.gather(*(pool.extract(f"page://{i}", body) for i, body in enumerate(batch)))
+        elapsed = time.perf_counter() - started
+        pool.shutdown()
+        print(f"  processes={processes:<3} {elapsed * 1000:>8.1f} ms  ({pages / elapsed:.1f} pages/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="timed runs per backend and fixture")
+    parser.add_argument("--pages", type=int, default=64, help="pages in the process pool benchmark")
+    parser.add_argument("--backend", default="auto", help="backend for the process pool benchmark")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    bench_backends(fixtures, args.runs)
+    asyncio.run(bench_pool(fixtures, args.pages, args.backend))
+
+
+if __name__ == "__main__":
+    main()
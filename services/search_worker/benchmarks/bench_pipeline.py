@@ -0,0 +1,264 @@
+"""
+Load test for the /research pipeline against local fakes.
+
+Starts a fake SearxNG + website farm in a separate process, swaps Apify,
+Google CSE and Gemini for in-process stubs, then drives concurrent /research
+requests through the real FastAPI app. Reports p50/p95/p99 latency per stage
+and end to end, requests/sec, event-loop lag and peak RSS, and writes the
+results as JSON (named after the current commit) for comparison with earlier
+runs.
+
+    python benchmarks/bench_pipeline.py --requests 200 --concurrency 20
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/<older>.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fakes import FarmConfig, StubApifyClient, StubGeminiModel, StubGoogleService, serve_farm
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Fake farm did not start on port {port}")
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+    return {"count": len(ordered), "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 4)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def configure_environment(args: argparse.Namespace, port: int, data_dir: str):
+    """Settings main.py reads at import time"""
+    os.environ.update({
+        "GOOGLE_API_KEY": "benchmark",
+        "APIFY_API_TOKEN": "benchmark",
+        "SEARXNG_BASE_URL": f"http://127.0.0.1:{port}",
+        "SEARCH_WORKER_DATA_DIR": data_dir,
+        "CRAWL_HOST_DELAY_MIN": str(args.host_delay),
+        "CRAWL_HOST_DELAY_MAX": str(args.host_delay),
+        "LOG_LEVEL": args.log_level,
+        # Every simulated client shares one address; measure the pipeline, not the rate limiter
+        "CLIENT_RATE_PER_MIN": "1000000",
+        "CLIENT_BURST": "1000000",
+        "ADMISSION_MAX_CONCURRENT": str(args.max_pipelines),
+        "ADMISSION_MAX_QUEUE": str(args.max_queue),
+    })
+    if args.extract_processes is not None:
+        os.environ["EXTRACT_PROCESSES"] = str(args.extract_processes)
+
+
+async def monitor_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.05):
+    """Sample how late a fixed-interval sleep wakes up; lateness is time the loop was blocked"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - started - interval))
+
+
+async def run_load(args: argparse.Namespace, farm: FarmConfig) -> Dict[str, Any]:
+    import httpx
+
+    import main as worker
+
+    # Swap every external dependency for its local stand-in
+    apify = StubApifyClient(args.apify_latency, args.apify_success_rate)
+    worker.rag_pipeline.clients.install(
+        apify=apify,
+        google_cse=StubGoogleService(farm, args.google_latency),
+        gemini=StubGeminiModel(args.gemini_latency),
+    )
+
+    # Time each stage as it passes through run_stage
+    stage_samples: Dict[str, List[float]] = {}
+    run_stage = worker.run_stage
+
+    async def timed_run_stage(stage, awaitable, timeout):
+        started = time.perf_counter()
+        try:
+            return await run_stage(stage, awaitable, timeout)
+        finally:
+            stage_samples.setdefault(stage, []).append(time.perf_counter() - started)
+
+    worker.run_stage = timed_run_stage
+
+    distinct_queries = max(1, int(args.requests * (1 - args.repeat_ratio)))
+    queries = [f"benchmark query {i % distinct_queries} {os.getpid()}" for i in range(args.requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    next_query = iter(queries)
+
+    # ASGITransport does not run lifespan events, so start and stop the app around the load
+    transport = httpx.ASGITransport(app=worker.app)
+    async with worker.lifespan(worker.app), httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def client_loop():
+            for query in next_query:
+                started = time.perf_counter()
+                response = await client.post("/research", json={"query": query, "max_results": farm.results_per_query})
+                latencies.append(time.perf_counter() - started)
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        lag_samples: List[float] = []
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(monitor_loop_lag(lag_samples, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await monitor
+
+    return {
+        "elapsed_secs": round(elapsed, 3),
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 3),
+        "status_codes": statuses,
+        "latency_secs": {
+            "total": percentiles(latencies),
+            **{stage: percentiles(samples) for stage, samples in stage_samples.items()},
+        },
+        "event_loop_lag_secs": percentiles(lag_samples),
+        "peak_rss_mb": {
+            # ru_maxrss is in KiB on Linux; children covers the extraction pool
+            "main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        },
+        "apify_runs_aborted": apify.aborted,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    results = report["results"]
+    print(f"\n{results['requests']} requests in {results['elapsed_secs']}s "
+          f"({results['requests_per_sec']} req/s), status codes {results['status_codes']}")
+    print(f"{'latency (s)':<14} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    rows = dict(results["latency_secs"], **{"loop lag": results["event_loop_lag_secs"]})
+    for name, stats in rows.items():
+        if stats["count"]:
+            print(f"{name:<14} {stats['count']:>6} {stats['p50']:>8.3f} {stats['p95']:>8.3f} {stats['p99']:>8.3f} {stats['max']:>8.3f}")
+    print(f"peak RSS: main {results['peak_rss_mb']['main']} MB, extraction workers {results['peak_rss_mb']['children']} MB")
+
+
+def print_comparison(report: Dict[str, Any], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['commit']} ({os.path.basename(baseline_path)}):")
+    old, new = baseline["results"], report["results"]
+
+    def delta(label: str, before: Optional[float], after: Optional[float]):
+        if before and after is not None:
+            print(f"  {label:<22} {before:>9.3f} -> {after:>9.3f}  ({(after - before) / before:+.1%})")
+
+    delta("requests/sec", old["requests_per_sec"], new["requests_per_sec"])
+    for stage, stats in new["latency_secs"].items():
+        for q in ("p50", "p99"):
+            delta(f"{stage} {q}", old["latency_secs"].get(stage, {}).get(q), stats[q])
+    delta("loop lag p99", old["event_loop_lag_secs"]["p99"], new["event_loop_lag_secs"]["p99"])
+    delta("peak RSS MB", old["peak_rss_mb"]["main"], new["peak_rss_mb"]["main"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100, help="total /research requests")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight at once")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="fraction of requests repeating an earlier query (cache hits)")
+    parser.add_argument("--hosts", type=int, default=8, help="distinct hosts in the website farm")
+    parser.add_argument("--results", type=int, default=10, help="search results per query")
+    parser.add_argument("--page-latency", type=float, default=0.2, help="mean page latency in seconds")
+    parser.add_argument("--page-jitter", type=float, default=0.1, help="standard deviation of page latency")
+    parser.add_argument("--page-kb", type=int, default=60, help="page size in KB")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="fraction of page requests that fail")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="fake SearxNG latency in seconds")
+    parser.add_argument("--google-latency", type=float, default=0.3, help="stub Google CSE latency in seconds")
+    parser.add_argument("--apify-latency", type=float, default=8.0, help="stub Apify run duration in seconds")
+    parser.add_argument("--apify-success-rate", type=float, default=0.9, help="fraction of Apify items with text")
+    parser.add_argument("--gemini-latency", type=float, default=0.8, help="stub Gemini base latency in seconds")
+    parser.add_argument("--host-delay", type=float, default=0.0, help="per-host politeness delay (CRAWL_HOST_DELAY_MIN/MAX)")
+    parser.add_argument("--max-pipelines", type=int, default=8, help="ADMISSION_MAX_CONCURRENT for the worker")
+    parser.add_argument("--max-queue", type=int, default=32, help="ADMISSION_MAX_QUEUE for the worker")
+    parser.add_argument("--extract-processes", type=int, default=None, help="EXTRACT_PROCESSES for the worker")
+    parser.add_argument("--log-level", default="WARNING", help="worker LOG_LEVEL during the run")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/pipeline-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    farm = FarmConfig(
+        port=free_port(),
+        hosts=args.hosts,
+        results_per_query=args.results,
+        search_latency=args.search_latency,
+        page_latency=args.page_latency,
+        page_jitter=args.page_jitter,
+        page_bytes=args.page_kb * 1024,
+        error_rate=args.error_rate,
+    )
+    farm_process = multiprocessing.Process(target=serve_farm, args=(farm,), daemon=True)
+    farm_process.start()
+    try:
+        wait_for_port(farm.port)
+        with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as data_dir:
+            configure_environment(args, farm.port, data_dir)
+            results = asyncio.run(run_load(args, farm))
+    finally:
+        farm_process.terminate()
+        farm_process.join()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+    }
+    print_report(report)
+    if args.compare:
+        print_comparison(report, args.compare)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Local stand-ins for every external service the pipeline talks to.
+
+- ``farm_app``: one ASGI app that answers like SearxNG (``/search``) and serves
+  a farm of generated web pages (``/page/...``) with configurable latency, size
+  and error rate. Pages carry an ``ETag`` and answer matching conditional
+  requests with ``304``. Run it in its own process with ``serve_farm`` and point the
+  pages at several loopback addresses (127.0.0.2, 127.0.0.3, ...) so the
+  crawler sees distinct hosts.
+- ``StubApifyClient``: the slice of ``ApifyClientAsync`` used by Stage 2.
+- ``StubGoogleService``: the Custom Search service object built by ``googleapiclient``.
+- ``StubGeminiModel``: ``generate_content_async`` with and without streaming.
+"""
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+WORDS = (
+    "market growth revenue strategy product customer research analysis model data "
+    "system network energy policy climate health science history culture design "
+    "platform software hardware security privacy finance investment capital risk "
+    "education learning language memory performance latency throughput scale cloud"
+).split()
+
+
+@dataclass
+class FarmConfig:
+    port: int
+    hosts: int = 8
+    results_per_query: int = 10
+    search_latency: float = 0.05
+    page_latency: float = 0.2
+    page_jitter: float = 0.1
+    page_bytes: int = 60_000
+    error_rate: float = 0.05
+
+
+def page_urls(config: FarmConfig, query: str) -> List[str]:
+    """Deterministic result URLs for a query, spread across the farm's hosts"""
+    seed = hashlib.blake2b(query.encode("utf-8"), digest_size=6).hexdigest()
+    return [
+        f"http://127.0.0.{2 + (i % config.hosts)}:{config.port}/page/{seed}-{i}"
+        for i in range(config.results_per_query)
+    ]
+
+
+def generate_text(seed: str, words: int) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    while words > 0:
+        length = rng.randint(8, 20)
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def generate_page(path: str, size: int) -> bytes:
+    """An article-like HTML page of roughly ``size`` bytes with boilerplate around the text"""
+    paragraphs = []
+    total = 0
+    i = 0
+    while total < size:
+        paragraph = f"<p>{generate_text(f'{path}:{i}', 60)}</p>"
+        paragraphs.append(paragraph)
+        total += len(paragraph)
+        i += 1
+    return (
+        f"<html><head><title>Page {path}</title><style>body{{margin:0}}</style>"
+        f"<script>var tracking = {{}};</script></head><body>"
+        f"<header><nav><a href='/'>Home</a> <a href='/about'>About</a></nav></header>"
+        f"<article><h1>Page {path}</h1>{''.join(paragraphs)}</article>"
+        f"<footer>Copyright</footer></body></html>"
+    ).encode("utf-8")
+
+
+def farm_app(config: FarmConfig):
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    pages: Dict[str, bytes] = {}
+
+    async def search(request: Request):
+        await asyncio.sleep(config.search_latency)
+        query = request.query_params.get("q", "")
+        return JSONResponse({
+            "query": query,
+            "results": [{"url": url, "title": url} for url in page_urls(config, query)],
+        })
+
+    async def page(request: Request):
+        path = request.path_params["path"]
+        await asyncio.sleep(max(0.0, random.gauss(config.page_latency, config.page_jitter)))
+        if random.random() < config.error_rate:
+            return Response("unavailable", status_code=random.choice([403, 429, 500, 503]))
+        etag = f'"{hashlib.blake2b(path.encode("utf-8"), digest_size=8).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        if path not in pages:
+            pages[path] = generate_page(path, config.page_bytes)
+        return Response(pages[path], media_type="text/html; charset=utf-8", headers={"ETag": etag})
+
+    return Starlette(routes=[Route("/search", search), Route("/page/{path}", page)])
+
+
+def serve_farm(config: FarmConfig):
+    """Process entry point: serve the farm on all loopback addresses"""
+    import uvicorn
+
+    uvicorn.run(farm_app(config), host="0.0.0.0", port=config.port, log_level="warning", access_log=False)
+
+
+class _StubActor:
+    def __init__(self, client: "StubApifyClient"):
+        self.client = client
+
+    async def start(self, run_input: Dict[str, Any], timeout_secs: Optional[int] = None) -> Dict[str, Any]:
+        await asyncio.sleep(0.05)
+        run_id = uuid.uuid4().hex
+        self.client.runs[run_id] = {
+            "urls": [start["url"] for start in run_input["startUrls"]],
+            "started": time.monotonic(),
+            "aborted": False,
+        }
+        return {"id": run_id, "defaultDatasetId": run_id}
+
+
+class _StubRun:
+    def __init__(self, client: "StubApifyClient", run_id: str):
+        self.client = client
+        self.run_id = run_id
+
+    async def get(self) -> Dict[str, Any]:
+        run = self.client.runs[self.run_id]
+        if run["aborted"]:
+            return {"status": "ABORTED"}
+        if time.monotonic() - run["started"] >= self.client.run_latency:
+            return {"status": "SUCCEEDED"}
+        return {"status": "RUNNING"}
+
+    async def abort(self):
+        self.client.runs[self.run_id]["aborted"] = True
+        self.client.aborted += 1
+
+
+class _StubDataset:
+    def __init__(self, client: "StubApifyClient", run_id: str):
+        self.client = client
+        self.run_id = run_id
+
+    async def list_items(self, offset: int = 0):
+        run = self.client.runs[self.run_id]
+        elapsed = time.monotonic() - run["started"]
+        # Items trickle in evenly over the run's duration
+        ready = len(run["urls"]) if elapsed >= self.client.run_latency else int(
+            len(run["urls"]) * elapsed / self.client.run_latency
+        )
+        items = []
+        for url in run["urls"][offset:ready]:
+            rng = random.Random(url)
+            text = generate_text(url, 400) if rng.random() < self.client.success_rate else ""
+            items.append({"url": url, "title": f"Apify {url}", "readableText": text, "loadedTime": ""})
+        return SimpleNamespace(items=items)
+
+
+class StubApifyClient:
+    """``ApifyClientAsync`` stand-in: runs take ``run_latency`` seconds and return items gradually"""
+
+    def __init__(self, run_latency: float = 8.0, success_rate: float = 0.9):
+        self.run_latency = run_latency
+        self.success_rate = success_rate
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.aborted = 0
+
+    def actor(self, name: str) -> _StubActor:
+        return _StubActor(self)
+
+    def run(self, run_id: str) -> _StubRun:
+        return _StubRun(self, run_id)
+
+    def dataset(self, dataset_id: str) -> _StubDataset:
+        return _StubDataset(self, dataset_id)
+
+
+class StubGoogleService:
+    """Custom Search service stand-in; ``execute`` blocks like the real client"""
+
+    def __init__(self, config: FarmConfig, latency: float = 0.3):
+        self.config = config
+        self.latency = latency
+
+    def cse(self) -> "StubGoogleService":
+        return self
+
+    def list(self, q: str, cx: str, num: int = 10) -> SimpleNamespace:
+        def execute(http: Any = None) -> Dict[str, Any]:
+            time.sleep(self.latency)
+            return {"items": [{"link": url} for url in page_urls(self.config, q)[:num]]}
+
+        return SimpleNamespace(execute=execute)
+
+
+class StubGeminiModel:
+    """``GenerativeModel`` stand-in: latency scales with prompt size, output streams in chunks"""
+
+    def __init__(self, base_latency: float = 0.8, per_1k_tokens: float = 0.1, chunks: int = 8):
+        self.base_latency = base_latency
+        self.per_1k_tokens = per_1k_tokens
+        self.chunks = chunks
+
+    def _latency(self, prompt: str) -> float:
+        return self.base_latency + self.per_1k_tokens * len(prompt) / 4000
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        answer = generate_text(prompt[:64], 200)
+        if not stream:
+            await asyncio.sleep(self._latency(prompt))
+            return SimpleNamespace(text=answer)
+
+        async def chunks():
+            step = len(answer) // self.chunks + 1
+            for start in range(0, len(answer), step):
+                await asyncio.sleep(self._latency(prompt) / self.chunks)
+                yield SimpleNamespace(text=answer[start:start + step])
+
+        return chunks()
@@ -0,0 +1,189 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from execution import BlockingExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TwoLevelCache:
+    """TTL + LRU cache with an in-process tier in front of a shared SQLite tier.
+
+    Entries live in namespaces (e.g. ``search`` for query -> URL list and
+    ``document`` for URL -> extracted document). Reads check the in-process
+    tier first and fall back to SQLite, promoting disk hits into memory. The
+    SQLite file runs in WAL mode so several uvicorn workers can share it and
+    entries survive restarts. Values must be JSON-serialisable.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        executor: BlockingExecutor,
+        memory_max_entries: int = 1024,
+        disk_max_entries: int = 50000,
+    ):
+        self.db_path = db_path
+        self.executor = executor
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        with self._db_lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entries (last_access)")
+            self._db.commit()
+
+    # In-process tier
+
+    def _memory_get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self._memory.get((namespace, key))
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._memory[(namespace, key)]
+            return None
+        self._memory.move_to_end((namespace, key))
+        return value
+
+    def _memory_set(self, namespace: str, key: str, value: Any, expires_at: float):
+        self._memory[(namespace, key)] = (expires_at, value)
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.memory_max_entries:
+            (evicted_namespace, _), _ = self._memory.popitem(last=False)
+            self._stats[evicted_namespace]["memory_evictions"] += 1
+
+    # SQLite tier (always called on the executor)
+
+    def _disk_get(self, namespace: str, key: str) -> Optional[Tuple[float, Any]]:
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._db.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self._db.commit()
+                return None
+            self._db.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+            self._db.commit()
+        return row[1], json.loads(row[0])
+
+    def _disk_set(self, namespace: str, key: str, value: Any, expires_at: float) -> int:
+        payload = json.dumps(value)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, payload, expires_at, time.time()),
+            )
+            self._db.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+            overflow = self._db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.disk_max_entries
+            if overflow > 0:
+                self._db.execute(
+                    "DELETE FROM cache_entries WHERE rowid IN (SELECT rowid FROM cache_entries ORDER BY last_access LIMIT ?)",
+                    (overflow,),
+                )
+            self._db.commit()
+        return max(overflow, 0)
+
+    def _disk_delete(self, namespace: Optional[str], key: Optional[str]) -> int:
+        clauses, params = [], []
+        if namespace is not None:
+            clauses.append("namespace = ?")
+            params.append(namespace)
+        if key is not None:
+            clauses.append("key = ?")
+            params.append(key)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._db_lock:
+            cursor = self._db.execute(f"DELETE FROM cache_entries{where}", params)
+            self._db.commit()
+        return cursor.rowcount
+
+    # Public API
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self._memory_get(namespace, key)
+        if value is not None:
+            self._stats[namespace]["memory_hits"] += 1
+            return value
+
+        try:
+            entry = await self.executor.run(self._disk_get, namespace, key)
+        except Exception as e:
+            logger.warning("Cache read failed", extra={"namespace": namespace, "key": key, "error": str(e)})
+            entry = None
+
+        if entry is None:
+            self._stats[namespace]["misses"] += 1
+            return None
+
+        expires_at, value = entry
+        self._stats[namespace]["disk_hits"] += 1
+        self._memory_set(namespace, key, value, expires_at)
+        return value
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        expires_at = time.time() + ttl
+        self._memory_set(namespace, key, value, expires_at)
+        self._stats[namespace]["sets"] += 1
+        try:
+            evicted = await self.executor.run(self._disk_set, namespace, key, value, expires_at)
+            self._stats[namespace]["disk_evictions"] += evicted
+        except Exception as e:
+            logger.warning("Cache write failed", extra={"namespace": namespace, "key": key, "error": str(e)})
+
+    async def invalidate(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        """Drop matching entries from both tiers; no arguments clears everything"""
+        for cached_namespace, cached_key in list(self._memory):
+            if (namespace is None or cached_namespace == namespace) and (key is None or cached_key == key):
+                del self._memory[(cached_namespace, cached_key)]
+        return await self.executor.run(self._disk_delete, namespace, key)
+
+    def stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        for namespace, counters in self._stats.items():
+            hits = counters["memory_hits"] + counters["disk_hits"]
+            lookups = hits + counters["misses"]
+            namespaces[namespace] = {
+                **counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+        return {
+            "memory_entries": len(self._memory),
+            "memory_max_entries": self.memory_max_entries,
+            "disk_max_entries": self.disk_max_entries,
+            "db_path": self.db_path,
+            "namespaces": namespaces,
+        }
+
+    def close(self):
+        with self._db_lock:
+            self._db.close()
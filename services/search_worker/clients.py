@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from execution import BlockingExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ClientUnavailable(RuntimeError):
+    """A backend client was requested but its credentials are not configured"""
+
+
+class ServiceClients:
+    """Process-wide clients for Gemini, Google Custom Search and Apify.
+
+    Each SDK is imported and its client built the first time it is needed, then
+    reused for the life of the process. ``start()`` builds every configured
+    client up front (from the app's lifespan hook) so the first request does
+    not pay for SDK imports or discovery-document parsing. Missing credentials
+    only disable the backend that needs them; asking for that client raises
+    ``ClientUnavailable``.
+    """
+
+    def __init__(
+        self,
+        google_api_key: Optional[str],
+        apify_api_token: Optional[str],
+        gemini_model: str = "gemini-1.5-flash",
+    ):
+        self.google_api_key = google_api_key
+        self.apify_api_token = apify_api_token
+        self.gemini_model = gemini_model
+        self._clients: Dict[str, Any] = {}
+        self._build_secs: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # httplib2 connections are not thread-safe, so each executor thread keeps its own
+        self._thread_local = threading.local()
+
+    @property
+    def google_configured(self) -> bool:
+        return bool(self.google_api_key)
+
+    @property
+    def apify_configured(self) -> bool:
+        return bool(self.apify_api_token)
+
+    def _build_gemini(self):
+        import google.generativeai as genai
+
+        genai.configure(api_key=self.google_api_key)
+        return genai.GenerativeModel(self.gemini_model)
+
+    def _build_google_cse(self):
+        from googleapiclient.discovery import build
+
+        # The service object only holds the parsed discovery document; requests bring their own connection
+        return build("customsearch", "v1", developerKey=self.google_api_key, cache_discovery=False)
+
+    def _build_apify(self):
+        from apify_client import ApifyClientAsync
+
+        return ApifyClientAsync(self.apify_api_token)
+
+    def _get(self, name: str, configured: bool, env_var: str, builder):
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        if not configured:
+            raise ClientUnavailable(f"{env_var} is not set, {name} is disabled")
+        with self._lock:
+            if name not in self._clients:
+                started = time.perf_counter()
+                try:
+                    self._clients[name] = builder()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._build_secs[name] = round(time.perf_counter() - started, 4)
+                self._errors.pop(name, None)
+                logger.info("Backend client ready", extra={"client": name, "build_secs": self._build_secs[name]})
+            return self._clients[name]
+
+    def gemini(self):
+        return self._get("gemini", self.google_configured, "GOOGLE_API_KEY", self._build_gemini)
+
+    def google_cse(self):
+        return self._get("google_cse", self.google_configured, "GOOGLE_API_KEY", self._build_google_cse)
+
+    def google_http(self):
+        """This thread's reusable HTTP connection for Google API requests"""
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            from googleapiclient.http import build_http
+
+            http = self._thread_local.http = build_http()
+        return http
+
+    def apify(self):
+        return self._get("apify", self.apify_configured, "APIFY_API_TOKEN", self._build_apify)
+
+    def install(self, **clients: Any):
+        """Use pre-built clients (e.g. local fakes in benchmarks) instead of building them"""
+        with self._lock:
+            self._clients.update(clients)
+
+    async def start(self, executor: BlockingExecutor):
+        """Import SDKs and build every configured client off the event loop"""
+        builders = {
+            "gemini": (self.google_configured, self.gemini),
+            "google_cse": (self.google_configured, self.google_cse),
+            "apify": (self.apify_configured, self.apify),
+        }
+        for name, (configured, get) in builders.items():
+            if not configured:
+                logger.warning("Backend client disabled, credentials missing", extra={"client": name})
+                continue
+            try:
+                await executor.run(get)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Backend client failed to build", extra={"client": name, "error": str(e)})
+
+    def ready(self, name: str) -> bool:
+        return name in self._clients
+
+    def status(self) -> Dict[str, Any]:
+        configured = {
+            "gemini": self.google_configured,
+            "google_cse": self.google_configured,
+            "apify": self.apify_configured,
+        }
+        return {
+            name: {
+                "configured": is_configured,
+                "ready": self.ready(name),
+                "build_secs": self._build_secs.get(name),
+                "error": self._errors.get(name),
+            }
+            for name, is_configured in configured.items()
+        }
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import random
+from email.message import Message
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from document_store import DocumentStore
+from domain_stats import DomainStatsStore
+from extraction import ExtractionPool
+from observability import CRAWL_RESULTS
+
+logger = logging.getLogger(__name__)
+
+
+def crawl_error_class(error: BaseException) -> str:
+    """Low-cardinality label for a failed fetch: ``http_<status>`` or the exception type"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"http_{error.response.status_code}"
+    return type(error).__name__
+
+
+def response_charset(headers: httpx.Headers) -> Optional[str]:
+    """The ``charset`` parameter of the Content-Type header, if one was sent"""
+    message = Message()
+    message["content-type"] = headers.get("content-type", "")
+    return message.get_content_charset()
+
+
+class AsyncCrawler:
+    """Concurrent direct-HTTP crawler with a pooled client and per-host politeness.
+
+    All fetches share one ``httpx.AsyncClient``. A global semaphore bounds the
+    total number of in-flight requests and a per-host semaphore bounds how hard
+    any single site is hit. Consecutive requests to the same host are spaced by
+    a random delay that is awaited with ``asyncio.sleep`` so the event loop keeps
+    serving other requests in the meantime.
+
+    Bodies are streamed and reading stops at ``max_body_bytes``; non-HTML
+    responses are dropped before their body is read. Parsing happens in the
+    ``extractor`` process pool. Every fetch is counted in the crawl results
+    metric under ``source``.
+
+    With a ``store``, pages it already holds are fetched conditionally
+    (``If-None-Match`` / ``If-Modified-Since``); a ``304`` returns the stored
+    document without downloading or parsing the page, and fresh pages are
+    written back with their validators.
+
+    With ``domain_stats``, every fetch's outcome, response time and extracted
+    size is recorded against its host.
+    """
+
+    def __init__(
+        self,
+        user_agents: Sequence[str],
+        extractor: ExtractionPool,
+        max_concurrency: int = 10,
+        per_host_concurrency: int = 2,
+        per_host_delay: Tuple[float, float] = (1.0, 3.0),
+        request_timeout: float = 30.0,
+        max_body_bytes: int = 2 * 1024 * 1024,
+        source: str = "direct",
+        store: Optional[DocumentStore] = None,
+        domain_stats: Optional[DomainStatsStore] = None,
+    ):
+        self.source = source
+        self.store = store
+        self.domain_stats = domain_stats
+        self.user_agents = list(user_agents)
+        self.extractor = extractor
+        self.max_body_bytes = max_body_bytes
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self.request_timeout = request_timeout
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_slots = asyncio.Semaphore(max_concurrency)
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_next_request: Dict[str, float] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared connection pool on first use (inside the running loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                    'Accept-Language': 'en-US,en;q=0.5',
+                    'Accept-Encoding': 'gzip, deflate',
+                    'Upgrade-Insecure-Requests': '1',
+                },
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=self.request_timeout,
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_slots[host]
+
+    async def _wait_for_host_turn(self, host: str):
+        """Reserve the next politeness slot for a host and sleep until it opens"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._host_next_request.get(host, now))
+        self._host_next_request[host] = slot + random.uniform(*self.per_host_delay)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _read_body(self, url: str, validators: Optional[Dict[str, str]] = None) -> Tuple[int, Optional[bytes], httpx.Headers]:
+        """Stream a response body, stopping at the byte cap.
+
+        Returns the status code, the body (None for ``304`` and non-HTML
+        content) and the response headers.
+        """
+        headers = {'User-Agent': random.choice(self.user_agents), **(validators or {})}
+        async with self._get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return 304, None, response.headers
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "text/html").lower()
+            if "html" not in content_type and not content_type.startswith("text/"):
+                logger.info("Skipping non-HTML content", extra={"url": url, "content_type": content_type})
+                return response.status_code, None, response.headers
+
+            chunks, size = [], 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.max_body_bytes:
+                    logger.info("Body exceeds size cap, truncating", extra={"url": url, "max_body_bytes": self.max_body_bytes})
+                    break
+            return response.status_code, b"".join(chunks)[:self.max_body_bytes], response.headers
+
+    async def _polite_read(self, host: str, url: str, validators: Optional[Dict[str, str]] = None):
+        """``_read_body`` behind the concurrency limits and politeness delay, plus its response time"""
+        async with self._host_semaphore(host):
+            await self._wait_for_host_turn(host)
+            async with self._global_slots:
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                status, body, headers = await self._read_body(url, validators)
+                return status, body, headers, loop.time() - started
+
+    async def _record(self, host: str, ok: bool, latency: Optional[float], document: Optional[Dict[str, Any]] = None, error_class: str = ""):
+        if self.domain_stats:
+            content_chars = len(document.get("content", "")) if document else 0
+            await self.domain_stats.record(host, ok, latency, content_chars, error_class)
+
+    async def fetch_robots(self, origin: str) -> Optional[str]:
+        """robots.txt of ``origin`` (scheme://host): "" when absent or forbidden, None when unreachable"""
+        try:
+            response = await self._get_client().get(
+                f"{origin}/robots.txt",
+                headers={'User-Agent': random.choice(self.user_agents)},
+                timeout=min(self.request_timeout, 10.0),
+            )
+        except httpx.HTTPError as e:
+            logger.info("robots.txt unreachable", extra={"origin": origin, "error_class": crawl_error_class(e)})
+            return None
+        if response.status_code >= 500:
+            return None
+        if response.status_code >= 400:
+            # No rules published (or not for us to read): everything is allowed
+            return ""
+        return response.text[:512 * 1024]
+
+    async def fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        """Fetch and extract a single URL, returning None on any failure"""
+        host = urlparse(url).netloc.lower()
+        try:
+            validators = await self.store.validators(url) if self.store else None
+            status, body, headers, latency = await self._polite_read(host, url, validators)
+
+            if status == 304 and self.store:
+                document = await self.store.not_modified(url)
+                if document is not None:
+                    CRAWL_RESULTS.labels(domain=host, source=self.source, outcome="not_modified", error_class="").inc()
+                    await self._record(host, True, latency, document)
+                    logger.info("Page not modified, reusing stored document", extra={"url": url})
+                    return document
+                # Evicted since its validators were read; fetch it in full
+                validators = None
+                status, body, headers, latency = await self._polite_read(host, url)
+            if body is None:
+                CRAWL_RESULTS.labels(domain=host, source=self.source, outcome="skipped", error_class="non_html").inc()
+                await self._record(host, False, latency, error_class="non_html")
+                return None
+            try:
+                document = await self.extractor.extract(url, body, response_charset(headers))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Our parser or process pool failed, not the site, so the domain stats are left alone
+                error_class = f"extract_{crawl_error_class(e)}"
+                CRAWL_RESULTS.labels(domain=host, source=self.source, outcome="error", error_class=error_class).inc()
+                logger.warning("Error extracting page", extra={"url": url, "error_class": error_class, "error": str(e)})
+                return None
+            if document:
+                CRAWL_RESULTS.labels(domain=host, source=self.source, outcome="ok", error_class="").inc()
+                await self._record(host, True, latency, document)
+                if self.store:
+                    await self.store.put(
+                        url,
+                        document,
+                        etag=headers.get("etag"),
+                        last_modified=headers.get("last-modified"),
+                        body_size=len(body),
+                        revalidated=validators is not None,
+                    )
+                logger.info("Crawled page", extra={"url": url, "title": document["title"]})
+            else:
+                CRAWL_RESULTS.labels(domain=host, source=self.source, outcome="skipped", error_class="too_short").inc()
+                await self._record(host, False, latency, error_class="too_short")
+                logger.info("Content too short, skipping", extra={"url": url})
+            return document
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error_class = crawl_error_class(e)
+            CRAWL_RESULTS.labels(domain=host, source=self.source, outcome="error", error_class=error_class).inc()
+            # A timeout took at least the whole request budget; other failures have no useful timing
+            await self._record(host, False, self.request_timeout if isinstance(e, httpx.TimeoutException) else None, error_class=error_class)
+            logger.warning("Error crawling page", extra={"url": url, "error_class": error_class, "error": str(e)})
+            return None
+
+    async def crawl(
+        self,
+        urls: List[str],
+        deadline: Optional[float] = None,
+        on_document: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fetch all URLs concurrently, returning whatever finished before the deadline.
+
+        ``on_document`` is called for each document the moment its fetch completes.
+        """
+        if not urls:
+            return []
+
+        tasks = [asyncio.create_task(self.fetch(url)) for url in urls]
+        if on_document:
+            for task in tasks:
+                task.add_done_callback(
+                    lambda t: on_document(t.result()) if not t.cancelled() and t.result() else None
+                )
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=deadline)
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. another source already won); stop every fetch
+            for task in tasks:
+                task.cancel()
+            raise
+
+        if pending:
+            logger.warning("Crawl deadline reached, abandoning pending fetches", extra={"deadline_secs": deadline, "pending": len(pending)})
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        # Keep the original URL order so the best search hits stay first
+        documents = []
+        for task in tasks:
+            if task in done and not task.cancelled() and task.result():
+                documents.append(task.result())
+
+        logger.info("Direct crawl complete", extra={"source": self.source, "documents": len(documents), "urls": len(urls)})
+        return documents
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,127 @@
+import hashlib
+from typing import Any, Dict, List, Sequence
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+import numpy as np
+
+from retrieval import tokenize
+
+# Query parameters that only identify the click, never the content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref_src", "ref_url", "referrer", "spm", "_ga", "_gl", "_hsenc", "_hsmi", "cmpid", "ncid",
+}
+# Not stripped: generic names like ``ref`` and ``source`` often select content (e.g. GitHub's ?ref=<branch>)
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _is_tracking(param: str) -> bool:
+    key = unquote_plus(param.split("=", 1)[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def strip_tracking_params(url: str) -> str:
+    """The URL to fetch: the original with only tracking parameters (and the fragment) removed.
+
+    Everything else is kept byte for byte (parameter order and encoding, bare
+    keys like ``?id``, trailing slashes), since servers may treat any of it as
+    significant.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+    kept = [param for param in parts.query.split("&") if param and not _is_tracking(param)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "&".join(kept), ""))
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalise a URL into the form used to compare pages (never fetched).
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the remaining query parameters and removes trailing
+    slashes from the path. The ``www.`` prefix is kept because some sites only
+    answer on it; ``url_identity`` ignores it when comparing.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    params = sorted(param for param in parts.query.split("&") if param and not _is_tracking(param))
+    return urlunsplit((scheme, host, path, "&".join(params), ""))
+
+
+def url_identity(url: str) -> str:
+    """Key under which two URLs count as the same page: canonical form without scheme or ``www.``"""
+    parts = urlsplit(canonicalize_url(url))
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return urlunsplit(("", host, parts.path, parts.query, ""))
+
+
+def dedupe_urls(urls: Sequence[str]) -> List[str]:
+    """Keep the first of any URLs that identify the same page, minus its tracking parameters"""
+    seen = set()
+    unique = []
+    for url in urls:
+        identity = url_identity(url)
+        if identity not in seen:
+            seen.add(identity)
+            unique.append(strip_tracking_params(url))
+    return unique
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles; near-identical texts differ in few bits"""
+    tokens = tokenize(text)
+    if len(tokens) < shingle_size:
+        shingles = [" ".join(tokens)] if tokens else []
+    else:
+        shingles = [" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+    if not shingles:
+        return 0
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in set(shingles))
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(-1, 64)
+    # A bit is set when more shingles have it set than unset
+    votes = bits.sum(axis=0) * 2 > bits.shape[0]
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def is_near_duplicate(fingerprint: int, kept: Sequence[int], max_distance: int) -> bool:
+    return any(hamming_distance(fingerprint, other) <= max_distance for other in kept)
+
+
+def dedupe_documents(documents: List[Dict[str, Any]], max_distance: int = 3) -> List[Dict[str, Any]]:
+    """Drop documents whose content is a near-duplicate of an earlier (better-ranked) one"""
+    kept, fingerprints = [], []
+    for doc in documents:
+        fingerprint = simhash(doc.get("content", ""))
+        if is_near_duplicate(fingerprint, fingerprints, max_distance):
+            continue
+        kept.append(doc)
+        fingerprints.append(fingerprint)
+    return kept
+
+
+def dedupe_chunks(ranked_chunks: List[Dict[str, Any]], max_distance: int = 3) -> List[Dict[str, Any]]:
+    """Drop chunks that near-duplicate a higher-ranked chunk (syndicated text, shared boilerplate)"""
+    kept, fingerprints = [], []
+    for chunk in ranked_chunks:
+        fingerprint = simhash(chunk["text"])
+        if is_near_duplicate(fingerprint, fingerprints, max_distance):
+            continue
+        kept.append(chunk)
+        fingerprints.append(fingerprint)
+    return kept
@@ -0,0 +1,223 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from execution import BlockingExecutor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # Optional: zlib is always available
+    zstandard = None
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def resolve_codec(preferred: str = "auto") -> str:
+    """zstd when requested (or "auto") and installed, else zlib"""
+    if preferred in ("auto", "zstd") and zstandard is not None:
+        return "zstd"
+    if preferred == "zstd":
+        logger.warning("zstandard not installed, storing documents with zlib")
+    return "zlib"
+
+
+class DocumentStore:
+    """Compressed, size-bounded store of extracted documents with their HTTP validators.
+
+    Each crawled page is kept as its extracted document (compressed JSON)
+    together with the ``ETag`` / ``Last-Modified`` headers it was served with
+    and the size of the HTML body. When the page is fetched again the crawler
+    sends a conditional GET; on ``304 Not Modified`` the stored document is
+    reused without downloading or parsing the page. Entries are evicted least
+    recently used first once the compressed total exceeds ``max_bytes``. The
+    SQLite file runs in WAL mode so workers share it.
+    """
+
+    def __init__(self, db_path: str, executor: BlockingExecutor, max_bytes: int = 256 * 1024 * 1024, codec: str = "auto"):
+        self.db_path = db_path
+        self.executor = executor
+        self.max_bytes = max_bytes
+        self.codec = resolve_codec(codec)
+        self._counters = {
+            "stored": 0,
+            "evicted": 0,
+            "revalidations": 0,
+            "not_modified": 0,
+            "modified": 0,
+            "body_bytes_saved": 0,
+        }
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS documents (
+                    url TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    document BLOB NOT NULL,
+                    raw_size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    body_size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_documents_last_access ON documents (last_access)")
+            self._db.commit()
+
+    # SQLite access (always called on the executor)
+
+    def _validators(self, url: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified FROM documents WHERE url = ? AND (etag IS NOT NULL OR last_modified IS NOT NULL)",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        headers = {}
+        if row[0]:
+            headers["If-None-Match"] = row[0]
+        if row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def _revalidatable(self, urls: List[str]) -> Set[str]:
+        if not urls:
+            return set()
+        placeholders = ",".join("?" * len(urls))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT url FROM documents WHERE url IN ({placeholders}) AND (etag IS NOT NULL OR last_modified IS NOT NULL)",
+                urls,
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def _load_not_modified(self, url: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT codec, document, body_size FROM documents WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE documents SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+            self._db.commit()
+        self._counters["not_modified"] += 1
+        self._counters["body_bytes_saved"] += row[2]
+        document = json.loads(_decompress(row[1], row[0]))
+        document["loadedTime"] = time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        return document
+
+    def _put(self, url: str, document: Dict[str, Any], etag: Optional[str], last_modified: Optional[str], body_size: int):
+        raw = json.dumps(document).encode("utf-8")
+        compressed = _compress(raw, self.codec)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (url, codec, document, raw_size, stored_size, body_size, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, self.codec, compressed, len(raw), len(compressed), body_size, etag, last_modified, now, now),
+            )
+            total = self._db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM documents").fetchone()[0]
+            evicted = 0
+            if total > self.max_bytes:
+                # Walk the least recently used entries until enough bytes are freed
+                to_free = total - self.max_bytes
+                victims = []
+                for victim_url, size in self._db.execute("SELECT url, stored_size FROM documents ORDER BY last_access"):
+                    if to_free <= 0:
+                        break
+                    victims.append((victim_url,))
+                    to_free -= size
+                self._db.executemany("DELETE FROM documents WHERE url = ?", victims)
+                evicted = len(victims)
+            self._db.commit()
+        self._counters["stored"] += 1
+        self._counters["evicted"] += evicted
+
+    def _totals(self) -> Dict[str, int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0), "
+                "COALESCE(SUM(etag IS NOT NULL OR last_modified IS NOT NULL), 0) FROM documents"
+            ).fetchone()
+        return {"documents": row[0], "raw_bytes": row[1], "stored_bytes": row[2], "revalidatable": row[3]}
+
+    # Public API
+
+    async def validators(self, url: str) -> Optional[Dict[str, str]]:
+        """Conditional request headers for a stored page, or None if it cannot be revalidated"""
+        try:
+            headers = await self.executor.run(self._validators, url)
+        except Exception as e:
+            logger.warning("Document store read failed", extra={"url": url, "error": str(e)})
+            return None
+        if headers:
+            self._counters["revalidations"] += 1
+        return headers
+
+    async def revalidatable(self, urls: Iterable[str]) -> Set[str]:
+        """The subset of ``urls`` stored with an ETag or Last-Modified"""
+        try:
+            return await self.executor.run(self._revalidatable, list(urls))
+        except Exception as e:
+            logger.warning("Document store read failed", extra={"error": str(e)})
+            return set()
+
+    async def not_modified(self, url: str) -> Optional[Dict[str, Any]]:
+        """Stored document for a page the server answered 304 for"""
+        return await self.executor.run(self._load_not_modified, url)
+
+    async def put(
+        self,
+        url: str,
+        document: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        body_size: int = 0,
+        revalidated: bool = False,
+    ):
+        """Store a freshly extracted document; ``revalidated`` marks a conditional GET that got a new body"""
+        if revalidated:
+            self._counters["modified"] += 1
+        try:
+            await self.executor.run(self._put, url, document, etag, last_modified, body_size)
+        except Exception as e:
+            logger.warning("Document store write failed", extra={"url": url, "error": str(e)})
+
+    async def stats(self) -> Dict[str, Any]:
+        totals = await self.executor.run(self._totals)
+        answered = self._counters["not_modified"] + self._counters["modified"]
+        return {
+            **totals,
+            **self._counters,
+            "codec": self.codec,
+            "max_bytes": self.max_bytes,
+            "compression_bytes_saved": totals["raw_bytes"] - totals["stored_bytes"],
+            "compression_ratio": round(totals["raw_bytes"] / totals["stored_bytes"], 2) if totals["stored_bytes"] else None,
+            "revalidation_hit_rate": round(self._counters["not_modified"] / answered, 4) if answered else 0.0,
+            "db_path": self.db_path,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,366 @@
+import json
+import logging
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from execution import BlockingExecutor
+
+logger = logging.getLogger(__name__)
+
+# Path segments of pages that need an account or a session (matched whole, so /author/ is fine)
+ACCOUNT_PATH_SEGMENTS = {
+    "login", "log-in", "logout", "signin", "sign-in", "sign_in", "signup", "sign-up", "sign_up",
+    "register", "auth", "oauth", "sso", "cart", "checkout", "basket",
+}
+
+# Sites that refuse most crawlers; they start with this many pseudo-failures and must earn their way back
+KNOWN_HOSTILE_DOMAINS = {
+    "reddit.com", "twitter.com", "x.com", "linkedin.com", "facebook.com", "instagram.com", "tiktok.com",
+}
+HOSTILE_PRIOR_FAILURES = 6.0
+
+# Beta prior for an unseen domain: optimistic but quick to move (1 success in 1.5 attempts)
+PRIOR_SUCCESSES = 1.0
+PRIOR_ATTEMPTS = 1.5
+DEFAULT_LATENCY_SECS = 2.0
+# Extracted characters that count as a full-value page
+TARGET_CONTENT_CHARS = 2000
+LATENCY_SAMPLES = 20
+
+
+def is_account_page(url: str) -> bool:
+    """True for login, sign-up, cart and checkout pages, judged by whole path segments"""
+    segments = (segment.split(".")[0] for segment in urlsplit(url).path.lower().split("/"))
+    return any(segment in ACCOUNT_PATH_SEGMENTS for segment in segments)
+
+
+def domain_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def _base_domain(domain: str) -> str:
+    host = domain.split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+class DomainStatsStore:
+    """Per-domain crawl history used to decide which URLs are worth fetching.
+
+    Every fetch records whether it produced a usable document, how long the
+    response took and how much text it yielded. Counts decay with a
+    ``half_life_secs`` half-life, so old failures fade and a domain that starts
+    working again recovers on its own. A domain whose estimated success rate
+    drops below ``min_success_rate`` (with at least ``min_evidence`` attempts
+    behind it) is skipped, except for one probe URL every
+    ``probe_interval_secs`` that keeps its record current.
+
+    The remaining URLs are ordered by expected value per second: success
+    probability times content yield, divided by median fetch latency.
+
+    robots.txt bodies are cached per domain for ``robots_ttl_secs`` and
+    disallowed paths are skipped. Rules are fetched in the background
+    (``stale_robots`` / ``store_robots``) so the hot path never waits on them.
+    The SQLite file runs in WAL mode so workers share what they learn.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        executor: BlockingExecutor,
+        half_life_secs: float = 86400,
+        min_success_rate: float = 0.2,
+        min_evidence: float = 4,
+        probe_interval_secs: float = 600,
+        robots_ttl_secs: float = 86400,
+        robots_retry_secs: float = 3600,
+        hostile_domains: Sequence[str] = tuple(KNOWN_HOSTILE_DOMAINS),
+    ):
+        self.db_path = db_path
+        self.executor = executor
+        self.half_life_secs = half_life_secs
+        self.min_success_rate = min_success_rate
+        self.min_evidence = min_evidence
+        self.probe_interval_secs = probe_interval_secs
+        self.robots_ttl_secs = robots_ttl_secs
+        self.robots_retry_secs = robots_retry_secs
+        self.hostile_domains = set(hostile_domains)
+        self._counters = {"recorded": 0, "skipped_unreliable": 0, "skipped_robots": 0, "probes": 0}
+        # Parsed robots.txt per domain, keyed by the fetch time it was parsed from
+        self._robots: Dict[str, Tuple[float, RobotFileParser]] = {}
+        self._lock = threading.Lock()
+        # Autocommit, with explicit BEGIN IMMEDIATE around read-modify-write so workers don't lose updates
+        self._db = sqlite3.connect(db_path, timeout=10, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS domains (
+                    domain TEXT PRIMARY KEY,
+                    attempts REAL NOT NULL DEFAULT 0,
+                    successes REAL NOT NULL DEFAULT 0,
+                    content_chars REAL NOT NULL DEFAULT 0,
+                    latencies TEXT NOT NULL DEFAULT '[]',
+                    last_error_class TEXT,
+                    updated_at REAL NOT NULL,
+                    last_success_at REAL,
+                    last_probe_at REAL,
+                    robots_txt TEXT,
+                    robots_fetched_at REAL
+                )
+                """
+            )
+
+    # Scoring
+
+    def _decay(self, updated_at: float, now: float) -> float:
+        return 0.5 ** (max(0.0, now - updated_at) / self.half_life_secs)
+
+    def _estimate(self, domain: str, row: Optional[tuple], now: float) -> Dict[str, Any]:
+        """Success probability, median latency, yield and value per second for one domain"""
+        prior_failures = HOSTILE_PRIOR_FAILURES if _base_domain(domain) in self.hostile_domains else 0.0
+        attempts = successes = content_chars = 0.0
+        latencies: List[float] = []
+        if row is not None:
+            decay = self._decay(row[5], now)
+            attempts, successes, content_chars = row[1] * decay, row[2] * decay, row[3] * decay
+            latencies = json.loads(row[4])
+        success_rate = (successes + PRIOR_SUCCESSES) / (attempts + PRIOR_ATTEMPTS + prior_failures)
+        latency = max(statistics.median(latencies), 0.05) if latencies else DEFAULT_LATENCY_SECS
+        content_yield = min(1.0, content_chars / successes / TARGET_CONTENT_CHARS) if successes >= 0.5 else 1.0
+        return {
+            "success_rate": success_rate,
+            "attempts": attempts,
+            "evidence": attempts + prior_failures,
+            "median_latency_secs": latency,
+            "content_yield": content_yield,
+            "value_per_sec": success_rate * max(content_yield, 0.05) / latency,
+        }
+
+    def _robots_parser(self, domain: str, robots_txt: Optional[str], fetched_at: Optional[float]) -> Optional[RobotFileParser]:
+        if robots_txt is None or fetched_at is None:
+            return None
+        cached = self._robots.get(domain)
+        if cached and cached[0] == fetched_at:
+            return cached[1]
+        parser = RobotFileParser()
+        parser.parse(robots_txt.splitlines())
+        if len(self._robots) > 10000:
+            self._robots.clear()
+        self._robots[domain] = (fetched_at, parser)
+        return parser
+
+    # SQLite access (always called on the executor)
+
+    def _rows(self, domains: List[str]) -> Dict[str, tuple]:
+        placeholders = ",".join("?" * len(domains))
+        rows = self._db.execute(
+            "SELECT domain, attempts, successes, content_chars, latencies, updated_at, last_probe_at, robots_txt, robots_fetched_at "
+            f"FROM domains WHERE domain IN ({placeholders})",
+            domains,
+        ).fetchall()
+        return {row[0]: row for row in rows}
+
+    def _plan(self, urls: List[str]) -> Dict[str, Any]:
+        now = time.time()
+        domains = sorted({domain_of(url) for url in urls})
+        with self._lock:
+            rows = self._rows(domains) if domains else {}
+            estimates = {domain: self._estimate(domain, rows.get(domain), now) for domain in domains}
+
+            kept: List[Tuple[float, int, str]] = []
+            unreliable: List[Tuple[float, int, str]] = []
+            skipped: Dict[str, str] = {}
+            probes = set()
+            for position, url in enumerate(urls):
+                domain = domain_of(url)
+                row = rows.get(domain)
+                parser = self._robots_parser(domain, row[7], row[8]) if row else None
+                if parser is not None and not parser.can_fetch("*", url):
+                    skipped[url] = "robots"
+                    continue
+                estimate = estimates[domain]
+                entry = (-estimate["value_per_sec"], position, url)
+                if estimate["evidence"] >= self.min_evidence and estimate["success_rate"] < self.min_success_rate:
+                    last_probe_at = row[6] if row else None
+                    due = last_probe_at is None or now - last_probe_at >= self.probe_interval_secs
+                    if domain not in probes and due:
+                        # One URL goes through so the domain's record stays current
+                        probes.add(domain)
+                        kept.append(entry)
+                    else:
+                        skipped[url] = "unreliable_domain"
+                        unreliable.append(entry)
+                    continue
+                kept.append(entry)
+
+            if probes:
+                self._db.executemany(
+                    "INSERT INTO domains (domain, updated_at, last_probe_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(domain) DO UPDATE SET last_probe_at = excluded.last_probe_at",
+                    [(domain, now, now) for domain in probes],
+                )
+
+            stale_robots = [
+                domain for domain in domains
+                if domain not in rows
+                or rows[domain][8] is None
+                or now - rows[domain][8] >= (self.robots_ttl_secs if rows[domain][7] is not None else self.robots_retry_secs)
+            ]
+
+        if not kept and unreliable:
+            # Crawling a doubtful domain beats having nothing to synthesize from
+            kept = unreliable
+            for _, _, url in unreliable:
+                skipped.pop(url, None)
+
+        self._counters["probes"] += len(probes)
+        self._counters["skipped_robots"] += sum(1 for reason in skipped.values() if reason == "robots")
+        self._counters["skipped_unreliable"] += sum(1 for reason in skipped.values() if reason == "unreliable_domain")
+        return {
+            "urls": [url for _, _, url in sorted(kept)],
+            "skipped": skipped,
+            "probes": sorted(probes),
+            "stale_robots": stale_robots,
+        }
+
+    def _record(self, domain: str, ok: bool, latency: Optional[float], content_chars: int, error_class: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT attempts, successes, content_chars, latencies, updated_at FROM domains WHERE domain = ?",
+                    (domain,),
+                ).fetchone()
+                attempts, successes, chars, latencies, updated_at = row if row else (0.0, 0.0, 0.0, "[]", now)
+                decay = self._decay(updated_at, now)
+                samples = json.loads(latencies)
+                if latency is not None:
+                    samples = (samples + [round(latency, 4)])[-LATENCY_SAMPLES:]
+                self._db.execute(
+                    "INSERT INTO domains (domain, attempts, successes, content_chars, latencies, last_error_class, updated_at, last_success_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(domain) DO UPDATE SET attempts = excluded.attempts, successes = excluded.successes, "
+                    "content_chars = excluded.content_chars, latencies = excluded.latencies, "
+                    "last_error_class = COALESCE(excluded.last_error_class, domains.last_error_class), "
+                    "updated_at = excluded.updated_at, "
+                    "last_success_at = COALESCE(excluded.last_success_at, domains.last_success_at)",
+                    (
+                        domain,
+                        attempts * decay + 1,
+                        successes * decay + (1 if ok else 0),
+                        chars * decay + (content_chars if ok else 0),
+                        json.dumps(samples),
+                        None if ok else error_class,
+                        now,
+                        now if ok else None,
+                    ),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        self._counters["recorded"] += 1
+
+    def _store_robots(self, domain: str, robots_txt: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO domains (domain, updated_at, robots_txt, robots_fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(domain) DO UPDATE SET robots_txt = excluded.robots_txt, robots_fetched_at = excluded.robots_fetched_at",
+                (domain, now, robots_txt, now),
+            )
+
+    def _report(self, limit: int) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT domain, attempts, successes, content_chars, latencies, updated_at, last_probe_at, robots_txt, robots_fetched_at, "
+                "last_error_class, last_success_at FROM domains"
+            ).fetchall()
+        domains = []
+        for row in rows:
+            estimate = self._estimate(row[0], row[:9], now)
+            domains.append({
+                "domain": row[0],
+                "success_rate": round(estimate["success_rate"], 3),
+                "attempts": round(estimate["attempts"], 2),
+                "median_latency_secs": round(estimate["median_latency_secs"], 3),
+                "content_yield": round(estimate["content_yield"], 3),
+                "value_per_sec": round(estimate["value_per_sec"], 4),
+                "skipped": estimate["evidence"] >= self.min_evidence and estimate["success_rate"] < self.min_success_rate,
+                "last_error_class": row[9],
+                "last_success_at": row[10],
+                "robots_cached": row[8] is not None and row[7] is not None,
+            })
+        # Worst offenders first: those are the ones worth looking at
+        domains.sort(key=lambda d: (not d["skipped"], d["value_per_sec"]))
+        return {"total": len(domains), "domains": domains[:limit]}
+
+    def _reset(self, domain: Optional[str]) -> int:
+        with self._lock:
+            if domain is None:
+                cursor = self._db.execute("DELETE FROM domains")
+            else:
+                cursor = self._db.execute("DELETE FROM domains WHERE domain = ?", (domain.lower(),))
+            self._robots.clear()
+        return cursor.rowcount
+
+    # Public API
+
+    async def plan(self, urls: Sequence[str]) -> Dict[str, Any]:
+        """Split URLs into those worth crawling (best value per second first) and skipped ones.
+
+        Returns ``urls`` (ordered), ``skipped`` (url -> reason), ``probes``
+        (unreliable domains let through this time) and ``stale_robots``
+        (domains whose robots.txt should be refreshed).
+        """
+        try:
+            return await self.executor.run(self._plan, list(urls))
+        except Exception as e:
+            logger.warning("Domain stats read failed", extra={"error": str(e)})
+            return {"urls": list(urls), "skipped": {}, "probes": [], "stale_robots": []}
+
+    async def record(
+        self,
+        domain: str,
+        ok: bool,
+        latency: Optional[float] = None,
+        content_chars: int = 0,
+        error_class: str = "",
+    ):
+        """Record one fetch: whether it yielded a document, its response time and extracted size"""
+        try:
+            await self.executor.run(self._record, domain, ok, latency, content_chars, error_class)
+        except Exception as e:
+            logger.warning("Domain stats write failed", extra={"domain": domain, "error": str(e)})
+
+    async def store_robots(self, domain: str, robots_txt: Optional[str]):
+        """Cache a robots.txt body ("" allows everything; None means unknown, retried later)"""
+        try:
+            await self.executor.run(self._store_robots, domain, robots_txt)
+        except Exception as e:
+            logger.warning("Domain stats write failed", extra={"domain": domain, "error": str(e)})
+
+    async def stats(self, limit: int = 50) -> Dict[str, Any]:
+        report = await self.executor.run(self._report, limit)
+        return {
+            **self._counters,
+            "min_success_rate": self.min_success_rate,
+            "half_life_secs": self.half_life_secs,
+            "probe_interval_secs": self.probe_interval_secs,
+            **report,
+        }
+
+    async def reset(self, domain: Optional[str] = None) -> int:
+        """Forget what was learned about one domain, or all of them"""
+        return await self.executor.run(self._reset, domain)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
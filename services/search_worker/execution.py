@@ -0,0 +1,71 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException
+
+from observability import STAGE_LATENCY, observe
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class BlockingExecutor:
+    """Bounded thread pool for SDK calls that have no async variant.
+
+    The pool size caps how many blocking calls run at once. Callers beyond that
+    wait on an asyncio semaphore rather than piling up in the executor's
+    unbounded work queue. A slot is only handed back when its thread is free
+    again, so calls that timed out but are still running keep counting against
+    the limit.
+    """
+
+    def __init__(self, max_workers: int = 8, thread_name_prefix: str = "blocking-sdk"):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = asyncio.Semaphore(max_workers)
+
+    @staticmethod
+    def _release_slot(loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore):
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:  # Loop already closed during shutdown
+            pass
+
+    async def run(self, func: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+        """Run ``func`` on the pool, raising ``asyncio.TimeoutError`` after ``timeout`` seconds.
+
+        A timed-out call stops being awaited immediately, but Python threads
+        cannot be killed: the thread finishes in the background and holds its
+        slot until then. A call that had not started yet is dropped instead.
+        """
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._pool.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._release_slot(loop, self._slots))
+        # Cancelling the wrapper cancels the pool future too if it is still queued
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_stage(stage: str, awaitable: Awaitable[T], timeout: Optional[float]) -> T:
+    """Await one pipeline stage under its own deadline, cancelling it on expiry.
+
+    ``stage`` is a short name ("search", "crawl", "synthesis") used both in the
+    504 detail and as the ``stage`` label of the stage latency histogram.
+    """
+    try:
+        with observe(STAGE_LATENCY, stage=stage):
+            return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Stage exceeded its deadline and was cancelled", extra={"stage": stage, "timeout_secs": timeout})
+        raise HTTPException(status_code=504, detail=f"Stage '{stage}' timed out after {timeout}s")
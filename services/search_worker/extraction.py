@@ -0,0 +1,199 @@
+import asyncio
+import codecs
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text never belongs in a document
+STRIP_TAGS = ["script", "style", "noscript", "nav", "footer", "header"]
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET_PATTERN = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+CHARSET_SNIFF_BYTES = 4096
+
+
+def _known_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip().strip("\"'")).name
+    except LookupError:
+        return None
+
+
+def sniff_encoding(html: bytes, encoding: Optional[str] = None) -> str:
+    """The page's codec: the response charset, else its <meta> charset, else UTF-8"""
+    match = META_CHARSET_PATTERN.search(html[:CHARSET_SNIFF_BYTES])
+    meta_encoding = match.group(1).decode("ascii", "ignore") if match else None
+    return _known_codec(encoding) or _known_codec(meta_encoding) or "utf-8"
+
+
+def _extract_selectolax(html: bytes, encoding: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+    from selectolax.lexbor import LexborHTMLParser
+
+    # Lexbor ignores <meta charset> and assumes UTF-8, so hand it text instead of bytes
+    tree = LexborHTMLParser(html.decode(sniff_encoding(html, encoding), errors="replace"))
+    title_node = tree.css_first("title")
+    title = title_node.text(strip=True) if title_node else None
+    tree.strip_tags(STRIP_TAGS)
+    root = tree.body or tree.root
+    text = root.text(separator="\n", strip=True) if root else ""
+    return title, text.split("\n")
+
+
+def _extract_lxml(html: bytes, encoding: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+    import lxml.etree
+    import lxml.html
+
+    # Without an explicit encoding libxml2 falls back to latin-1 for undeclared pages
+    parser = lxml.html.HTMLParser(encoding=sniff_encoding(html, encoding))
+    try:
+        root = lxml.html.fromstring(html, parser=parser)
+    except lxml.etree.ParserError:  # "Document is empty"
+        return None, []
+    title = root.findtext(".//title")
+    for element in root.xpath("|".join(f"//{tag}" for tag in STRIP_TAGS + ["title"])):
+        element.drop_tree()
+    return title, list(root.itertext())
+
+
+def _extract_bs4(html: bytes, encoding: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser", from_encoding=_known_codec(encoding))
+    title_element = soup.find("title")
+    title = title_element.get_text() if title_element else None
+    for element in soup(STRIP_TAGS):
+        element.decompose()
+    return title, soup.get_text(separator="\n", strip=True).split("\n")
+
+
+# Parser backends, fastest first
+EXTRACTORS: Dict[str, Callable[[bytes, Optional[str]], Tuple[Optional[str], List[str]]]] = {
+    "selectolax": _extract_selectolax,
+    "lxml": _extract_lxml,
+    "bs4": _extract_bs4,
+}
+_BACKEND_MODULES = {"selectolax": "selectolax.lexbor", "lxml": "lxml.html", "bs4": "bs4"}
+
+
+def available_extractors() -> List[str]:
+    """Backends whose parser library is installed, fastest first"""
+    available = []
+    for name, module in _BACKEND_MODULES.items():
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def resolve_backend(preferred: Optional[str] = None) -> str:
+    """Pick the requested backend if installed, else the fastest available one"""
+    available = available_extractors()
+    if not available:
+        raise RuntimeError("No HTML parser installed (need selectolax, lxml or beautifulsoup4)")
+    if preferred and preferred != "auto":
+        if preferred in available:
+            return preferred
+        logger.warning("HTML extractor not installed, using fallback", extra={"preferred": preferred, "backend": available[0]})
+    return available[0]
+
+
+def extract_document(
+    url: str, html: bytes, backend: str = "bs4", max_chars: int = 5000, encoding: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Turn a raw HTML body into a document dict, or None if it has no substantial text.
+
+    ``encoding`` is the charset from the response's Content-Type header, if any.
+    """
+    if not html.strip():
+        return None
+    title, lines = EXTRACTORS[backend](html, encoding)
+    title = title.strip() if title and title.strip() else url
+
+    # Clean up content, stopping once we have enough text to fill the limit
+    kept, length = [], 0
+    for line in lines:
+        line = line.strip()
+        if line:
+            kept.append(line)
+            length += len(line) + 1
+            if length > max_chars:
+                break
+    clean_content = "\n".join(kept)
+
+    if not clean_content or len(clean_content) <= 100:  # Only include substantial content
+        return None
+
+    return {
+        "content": clean_content[:max_chars],  # Limit content length
+        "url": url,
+        "title": title,
+        "loadedTime": time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    }
+
+
+class ExtractionPool:
+    """Runs HTML extraction in a process pool so pages parse in parallel off the event loop.
+
+    With ``processes=0`` extraction runs inline, which is only meant for
+    debugging and benchmarks.
+    """
+
+    def __init__(self, backend: Optional[str] = None, processes: Optional[int] = None, max_chars: int = 5000):
+        self.backend = resolve_backend(backend)
+        self.max_chars = max_chars
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        logger.info("HTML extraction configured", extra={"backend": self.backend, "processes": self.processes})
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Drop a pool whose worker died, unless a concurrent caller already replaced it"""
+        if self._pool is pool:
+            logger.warning("Extraction worker died, restarting the process pool", extra={"processes": self.processes})
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def extract(self, url: str, html: bytes, encoding: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if self.processes == 0:
+            return extract_document(url, html, self.backend, self.max_chars, encoding)
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                return await loop.run_in_executor(
+                    pool, extract_document, url, html, self.backend, self.max_chars, encoding
+                )
+            except BrokenProcessPool:
+                # A worker was killed (OOM, parser crash); rebuild the pool and retry once
+                self._discard_pool(pool)
+                if attempt:
+                    raise
+
+    async def warmup(self):
+        """Start every worker process and load its parser so the first pages don't pay for it"""
+        if self.processes == 0:
+            return
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._get_pool(), extract_document, "warmup", b"<html></html>", self.backend, self.max_chars)
+            for _ in range(self.processes)
+        ))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,46 +1,179 @@
 import os
 import json
+import ipaddress
+import secrets
 import asyncio
-import requests
-from typing import List, Dict, Any
-from urllib.parse import urljoin, urlparse
-import re
+import logging
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator, Awaitable
+from urllib.parse import urlparse
 import time
-import random
-from bs4 import BeautifulSoup
-import markdown
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
 from pydantic import BaseModel
 import uvicorn
-import google.generativeai as genai
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from apify_client import ApifyClient
+import httpx
+
+from clients import ClientUnavailable, ServiceClients
+from crawler import AsyncCrawler
+from extraction import ExtractionPool
+from execution import BlockingExecutor, run_stage
+from cache import TwoLevelCache
+from document_store import DocumentStore
+from domain_stats import DomainStatsStore, domain_of, is_account_page
+from singleflight import SingleFlight
+from search_providers import CircuitBreaker, HedgedSearch, SearchProvider
+from retrieval import chunk_documents, estimate_tokens, pack_chunks, rank_chunks
+from reranker import EmbeddingStore, HashingEmbedder, SemanticReranker
+from batch import BatchJobManager
+from dedup import dedupe_chunks, dedupe_documents, dedupe_urls
+from admission import BATCH, INTERACTIVE, PRIORITIES, AdmissionController
+from answer_cache import AnswerCache
+from observability import (
+    BACKEND_LATENCY, CRAWL_RESULTS, DUPLICATES_DROPPED, INFLIGHT_REQUESTS, PROMPT_CHARS, PROMPT_TOKENS, URLS_SKIPPED,
+    configure_logging, new_trace_id, observe, render_metrics, trace_id_var,
+)
+
+# Structured JSON logs on stdout; every line carries the request's trace ID
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+configure_logging(LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build and warm the backend clients before serving; release everything on shutdown"""
+    await start_pipeline()
+    try:
+        yield
+    finally:
+        await close_pipeline()
 
 # FastAPI app initialization
-app = FastAPI(title="Research RAG Microservice", version="1.0.0")
+app = FastAPI(title="Research RAG Microservice", version="1.0.0", lifespan=lifespan)
 
 # Environment variables
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 APIFY_API_TOKEN = os.getenv("APIFY_API_TOKEN")
 SEARXNG_BASE_URL = os.getenv("SEARXNG_BASE_URL", "http://localhost:8080")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID", "c07d6b77b2e584cc9")  # Default public CSE ID
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+# Startup: clients are built once per worker, then pools are warmed (best effort, bounded)
+CLIENT_WARMUP_TIMEOUT_SECS = float(os.getenv("CLIENT_WARMUP_TIMEOUT_SECS", "10"))
+
+# Fallback crawler tuning
+CRAWL_MAX_CONCURRENCY = int(os.getenv("CRAWL_MAX_CONCURRENCY", "10"))
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", "2"))
+CRAWL_HOST_DELAY_MIN = float(os.getenv("CRAWL_HOST_DELAY_MIN", "1.0"))
+CRAWL_HOST_DELAY_MAX = float(os.getenv("CRAWL_HOST_DELAY_MAX", "3.0"))
+CRAWL_REQUEST_TIMEOUT_SECS = float(os.getenv("CRAWL_REQUEST_TIMEOUT_SECS", "30"))
+CRAWL_DEADLINE_SECS = float(os.getenv("CRAWL_DEADLINE_SECS", "45"))
+CRAWL_MAX_BODY_BYTES = int(os.getenv("CRAWL_MAX_BODY_BYTES", str(2 * 1024 * 1024)))
+
+# HTML extraction: "auto" picks selectolax > lxml > bs4; EXTRACT_PROCESSES defaults to the CPU count
+HTML_EXTRACTOR = os.getenv("HTML_EXTRACTOR", "auto")
+EXTRACT_PROCESSES = int(os.getenv("EXTRACT_PROCESSES")) if os.getenv("EXTRACT_PROCESSES") else None
+
+# Per-backend timeouts
+SEARXNG_TIMEOUT_SECS = float(os.getenv("SEARXNG_TIMEOUT_SECS", "30"))
+GOOGLE_CSE_TIMEOUT_SECS = float(os.getenv("GOOGLE_CSE_TIMEOUT_SECS", "15"))
+APIFY_RUN_TIMEOUT_SECS = int(os.getenv("APIFY_RUN_TIMEOUT_SECS", "180"))
+APIFY_POLL_INTERVAL_SECS = float(os.getenv("APIFY_POLL_INTERVAL_SECS", "3"))
+APIFY_TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED"}
+
+# Stage 2 races Apify against the direct crawler and moves on once a quorum of documents is in
+CRAWL_QUORUM = int(os.getenv("CRAWL_QUORUM", "3"))
+CRAWL_QUORUM_GRACE_SECS = float(os.getenv("CRAWL_QUORUM_GRACE_SECS", "2"))
+CRAWL_HARVEST_DEADLINE_SECS = float(os.getenv("CRAWL_HARVEST_DEADLINE_SECS", "90"))
+
+# Batch research jobs: own crawl scheduler limits and a Gemini requests-per-minute budget
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "500"))
+BATCH_CRAWL_MAX_CONCURRENCY = int(os.getenv("BATCH_CRAWL_MAX_CONCURRENCY", "16"))
+BATCH_CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("BATCH_CRAWL_PER_HOST_CONCURRENCY", "2"))
+BATCH_CRAWL_DEADLINE_SECS = float(os.getenv("BATCH_CRAWL_DEADLINE_SECS", "1800"))
+BATCH_SYNTHESIS_RPM = float(os.getenv("BATCH_SYNTHESIS_RPM", "30"))
+BATCH_JOB_TTL_SECS = float(os.getenv("BATCH_JOB_TTL_SECS", "86400"))
+
+# Approximate prompt tokens spent on retrieved passages in Stage 3
+SYNTHESIS_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_TOKEN_BUDGET", "2000"))
+
+# Optional local semantic reranking of BM25 candidates (hashed-feature embeddings, no network)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "40"))
+RERANK_SEMANTIC_WEIGHT = float(os.getenv("RERANK_SEMANTIC_WEIGHT", "0.5"))
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))
+
+# Near-duplicate elimination: max SimHash Hamming distance (of 64 bits) to count as a duplicate
+DEDUP_DOCUMENT_MAX_DISTANCE = int(os.getenv("DEDUP_DOCUMENT_MAX_DISTANCE", "3"))
+DEDUP_CHUNK_MAX_DISTANCE = int(os.getenv("DEDUP_CHUNK_MAX_DISTANCE", "3"))
+
+# Search provider hedging and circuit breakers
+SEARCH_HEDGE_DELAY_SECS = float(os.getenv("SEARCH_HEDGE_DELAY_SECS", "1.5"))
+SEARCH_MERGE_WINDOW_SECS = float(os.getenv("SEARCH_MERGE_WINDOW_SECS", "0.5"))
+SEARCH_DEADLINE_SECS = float(os.getenv("SEARCH_DEADLINE_SECS", "20"))
+SEARCH_BREAKER_FAILURES = int(os.getenv("SEARCH_BREAKER_FAILURES", "3"))
+SEARCH_BREAKER_COOLDOWN_SECS = float(os.getenv("SEARCH_BREAKER_COOLDOWN_SECS", "60"))
+
+# Per-stage deadlines for /research; a stage that overruns is cancelled with a 504
+STAGE_1_TIMEOUT_SECS = float(os.getenv("STAGE_1_TIMEOUT_SECS", "60"))
+STAGE_2_TIMEOUT_SECS = float(os.getenv("STAGE_2_TIMEOUT_SECS", "240"))
+STAGE_3_TIMEOUT_SECS = float(os.getenv("STAGE_3_TIMEOUT_SECS", "90"))
 
-# Validate API keys
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY environment variable is required")
-if not APIFY_API_TOKEN:
-    raise ValueError("APIFY_API_TOKEN environment variable is required")
+# Admission control in front of the research endpoints
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_QUEUE_TIMEOUT_SECS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECS", "30"))
+CLIENT_RATE_PER_MIN = float(os.getenv("CLIENT_RATE_PER_MIN", "30"))
+CLIENT_BURST = float(os.getenv("CLIENT_BURST", "10"))
+# X-Client-ID is only honoured from these proxy addresses, or with the shared proxy secret
+TRUSTED_PROXY_IPS = {ip.strip() for ip in os.getenv("TRUSTED_PROXY_IPS", "127.0.0.1,::1").split(",") if ip.strip()}
+PROXY_SHARED_SECRET = os.getenv("PROXY_SHARED_SECRET")
 
-# Initialize Google AI
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Threads reserved for SDK calls that have no async variant
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "8"))
+# Google CSE calls get their own threads so slow searches cannot starve local SQLite I/O
+GOOGLE_CSE_EXECUTOR_WORKERS = int(os.getenv("GOOGLE_CSE_EXECUTOR_WORKERS", "4"))
+
+# Local state shared by all workers on this host (caches, stores)
+DATA_DIR = os.getenv("SEARCH_WORKER_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Search result / crawled document cache
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(DATA_DIR, "research_cache.db"))
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "1024"))
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("CACHE_DISK_MAX_ENTRIES", "50000"))
+SEARCH_CACHE_TTL_SECS = float(os.getenv("SEARCH_CACHE_TTL_SECS", "3600"))
+DOCUMENT_CACHE_TTL_SECS = float(os.getenv("DOCUMENT_CACHE_TTL_SECS", "86400"))
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+# Compressed store of crawled pages with ETag/Last-Modified for conditional refreshes
+DOCUMENT_STORE_PATH = os.getenv("DOCUMENT_STORE_PATH", os.path.join(DATA_DIR, "documents.db"))
+DOCUMENT_STORE_MAX_BYTES = int(os.getenv("DOCUMENT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+DOCUMENT_STORE_CODEC = os.getenv("DOCUMENT_STORE_CODEC", "auto")  # auto (zstd if installed), zstd or zlib
+
+# Per-domain crawl history (success rate, latency, yield, robots.txt) deciding which URLs get crawled
+DOMAIN_STATS_PATH = os.getenv("DOMAIN_STATS_PATH", os.path.join(DATA_DIR, "domains.db"))
+DOMAIN_STATS_HALF_LIFE_SECS = float(os.getenv("DOMAIN_STATS_HALF_LIFE_SECS", "86400"))
+DOMAIN_MIN_SUCCESS_RATE = float(os.getenv("DOMAIN_MIN_SUCCESS_RATE", "0.2"))
+DOMAIN_MIN_EVIDENCE = float(os.getenv("DOMAIN_MIN_EVIDENCE", "4"))
+DOMAIN_PROBE_INTERVAL_SECS = float(os.getenv("DOMAIN_PROBE_INTERVAL_SECS", "600"))
+ROBOTS_ENABLED = os.getenv("ROBOTS_ENABLED", "true").lower() in ("1", "true", "yes")
+ROBOTS_TTL_SECS = float(os.getenv("ROBOTS_TTL_SECS", "86400"))
+
+# Answer cache: serves stored answers for repeated or reworded queries
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(DATA_DIR, "answers.db"))
+ANSWER_CACHE_TTL_SECS = float(os.getenv("ANSWER_CACHE_TTL_SECS", "21600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
 
 # Request/Response models
 class SearchRequest(BaseModel):
     query: str
     max_results: int = 10
+    bypass_cache: bool = False  # Skip the answer cache and run the full pipeline
 
 class SearchResponse(BaseModel):
     query: str
@@ -48,26 +181,114 @@ class SearchResponse(BaseModel):
     citations: List[Dict[str, Any]]
     sources: List[str]
 
+class BatchRequest(BaseModel):
+    requests: List[SearchRequest]
+
 class RAGPipeline:
     def __init__(self):
-        self.apify_client = ApifyClient(APIFY_API_TOKEN)
+        # SDK clients are imported and built once, at startup or on first use
+        self.clients = ServiceClients(GOOGLE_API_KEY, APIFY_API_TOKEN, GEMINI_MODEL)
+        self.executor = BlockingExecutor(max_workers=BLOCKING_EXECUTOR_WORKERS)
+        self.search_executor = BlockingExecutor(max_workers=GOOGLE_CSE_EXECUTOR_WORKERS, thread_name_prefix="google-cse")
+        self.search_client = httpx.AsyncClient(timeout=SEARXNG_TIMEOUT_SECS)
+        self.cache = TwoLevelCache(
+            CACHE_DB_PATH,
+            self.executor,
+            memory_max_entries=CACHE_MEMORY_MAX_ENTRIES,
+            disk_max_entries=CACHE_DISK_MAX_ENTRIES,
+        )
+        self.document_store = DocumentStore(
+            DOCUMENT_STORE_PATH,
+            self.executor,
+            max_bytes=DOCUMENT_STORE_MAX_BYTES,
+            codec=DOCUMENT_STORE_CODEC,
+        )
+        self.domain_stats = DomainStatsStore(
+            DOMAIN_STATS_PATH,
+            self.executor,
+            half_life_secs=DOMAIN_STATS_HALF_LIFE_SECS,
+            min_success_rate=DOMAIN_MIN_SUCCESS_RATE,
+            min_evidence=DOMAIN_MIN_EVIDENCE,
+            probe_interval_secs=DOMAIN_PROBE_INTERVAL_SECS,
+            robots_ttl_secs=ROBOTS_TTL_SECS,
+        )
+        # robots.txt refreshes run in the background; keep references until they finish
+        self.robots_refreshes: Dict[str, asyncio.Task] = {}
+        self.answer_cache: Optional[AnswerCache] = None
+        if ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                ANSWER_CACHE_PATH,
+                self.executor,
+                ttl_secs=ANSWER_CACHE_TTL_SECS,
+                max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            )
+        # Search backends in priority order; later ones are hedged in after a delay
+        search_providers = [
+            SearchProvider(
+                "searxng",
+                self.stage_1_search_urls_searxng,
+                CircuitBreaker(SEARCH_BREAKER_FAILURES, SEARCH_BREAKER_COOLDOWN_SECS)
+            ),
+        ]
+        if self.clients.google_configured:
+            search_providers.append(SearchProvider(
+                "google_cse",
+                self.stage_1_search_urls_google,
+                CircuitBreaker(SEARCH_BREAKER_FAILURES, SEARCH_BREAKER_COOLDOWN_SECS)
+            ))
+        self.search = HedgedSearch(
+            search_providers,
+            hedge_delay=SEARCH_HEDGE_DELAY_SECS,
+            merge_window=SEARCH_MERGE_WINDOW_SECS,
+            deadline=SEARCH_DEADLINE_SECS,
+        )
+        # Semantic reranker with a persistent memory-mapped embedding store
+        self.reranker = None
+        if RERANK_ENABLED:
+            embedder = HashingEmbedder(EMBEDDING_DIM)
+            self.reranker = SemanticReranker(
+                embedder,
+                EmbeddingStore(DATA_DIR, embedder.name, embedder.dim),
+                semantic_weight=RERANK_SEMANTIC_WEIGHT,
+            )
+        # Coalesces concurrent crawls of the same URL across requests
+        self.url_flights = SingleFlight("crawl")
+        # Batch jobs coalesce among themselves only: interactive requests must never queue behind a batch crawl
+        self.batch_url_flights = SingleFlight("batch_crawl")
         self.chunk_size = 1000
         self.chunk_overlap = 200
-        # Domains that commonly block crawlers
-        self.blocked_domains = {
-            'reddit.com', 'www.reddit.com',
-            'twitter.com', 'x.com',
-            'linkedin.com', 'www.linkedin.com',
-            'facebook.com', 'www.facebook.com',
-            'instagram.com', 'www.instagram.com',
-            'tiktok.com', 'www.tiktok.com'
-        }
         # User agents for rotation
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         ]
+        # Shared pooled crawler used by the direct-HTTP fallback
+        self.extractor = ExtractionPool(HTML_EXTRACTOR, EXTRACT_PROCESSES)
+        self.crawler = AsyncCrawler(
+            self.user_agents,
+            self.extractor,
+            max_concurrency=CRAWL_MAX_CONCURRENCY,
+            per_host_concurrency=CRAWL_PER_HOST_CONCURRENCY,
+            per_host_delay=(CRAWL_HOST_DELAY_MIN, CRAWL_HOST_DELAY_MAX),
+            request_timeout=CRAWL_REQUEST_TIMEOUT_SECS,
+            max_body_bytes=CRAWL_MAX_BODY_BYTES,
+            store=self.document_store,
+            domain_stats=self.domain_stats,
+        )
+        # Separate scheduler for batch jobs so overnight runs never starve interactive crawls
+        self.batch_crawler = AsyncCrawler(
+            self.user_agents,
+            self.extractor,
+            max_concurrency=BATCH_CRAWL_MAX_CONCURRENCY,
+            per_host_concurrency=BATCH_CRAWL_PER_HOST_CONCURRENCY,
+            per_host_delay=(CRAWL_HOST_DELAY_MIN, CRAWL_HOST_DELAY_MAX),
+            request_timeout=CRAWL_REQUEST_TIMEOUT_SECS,
+            max_body_bytes=CRAWL_MAX_BODY_BYTES,
+            source="batch",
+            store=self.document_store,
+            domain_stats=self.domain_stats,
+        )
     
     async def stage_1_search_urls_searxng(self, query: str, max_results: int = 10) -> List[str]:
         """Stage 1a: Query SearxNG for top URLs"""
@@ -78,45 +299,45 @@ class RAGPipeline:
             "categories": "general"
         }
         
-        response = requests.get(search_url, params=params, timeout=30)
-        response.raise_for_status()
-        
-        search_results = response.json()
+        with observe(BACKEND_LATENCY, backend="searxng"):
+            response = await self.search_client.get(search_url, params=params)
+            response.raise_for_status()
+            search_results = response.json()
         urls = []
         
         for result in search_results.get("results", [])[:max_results]:
             if "url" in result:
                 urls.append(result["url"])
         
-        print(f"Stage 1a (SearxNG) Complete: Found {len(urls)} URLs")
+        logger.info("Stage 1a (SearxNG) complete", extra={"urls": len(urls)})
         return urls
     
     async def stage_1_search_urls_google(self, query: str, max_results: int = 10) -> List[str]:
         """Stage 1b: Query Google Custom Search API for top URLs"""
         try:
-            # Build Google Custom Search service
-            service = build("customsearch", "v1", developerKey=GOOGLE_API_KEY)
+            def search() -> Dict[str, Any]:
+                # Shared Custom Search service, this thread's pooled connection
+                service = self.clients.google_cse()
+                return service.cse().list(
+                    q=query,
+                    cx=GOOGLE_CSE_ID,
+                    num=min(max_results, 10)  # Google CSE max is 10 per request
+                ).execute(http=self.clients.google_http())
             
-            # Perform search
-            result = service.cse().list(
-                q=query,
-                cx=GOOGLE_CSE_ID,
-                num=min(max_results, 10)  # Google CSE max is 10 per request
-            ).execute()
+            # The discovery client is synchronous, so run it on its own bounded executor
+            with observe(BACKEND_LATENCY, backend="google_cse"):
+                result = await self.search_executor.run(search, timeout=GOOGLE_CSE_TIMEOUT_SECS)
             
             urls = []
             for item in result.get('items', []):
                 if 'link' in item:
                     urls.append(item['link'])
             
-            print(f"Stage 1b (Google CSE) Complete: Found {len(urls)} URLs")
+            logger.info("Stage 1b (Google CSE) complete", extra={"urls": len(urls)})
             return urls
             
-        except HttpError as e:
-            print(f"Google Custom Search API error: {str(e)}")
-            raise
         except Exception as e:
-            print(f"Error in Google Custom Search: {str(e)}")
+            logger.warning("Error in Google Custom Search", extra={"error": str(e)})
             raise
     
     async def stage_1_search_urls_fallback(self, query: str, max_results: int = 10) -> List[str]:
@@ -131,332 +352,801 @@ class RAGPipeline:
             f"https://medium.com/search?q={query.replace(' ', '%20')}"
         ]
         
-        print(f"Stage 1c (Fallback URLs) Complete: Generated {len(base_urls[:max_results])} URLs")
+        logger.info("Stage 1c (fallback URLs) complete", extra={"urls": len(base_urls[:max_results])})
         return base_urls[:max_results]
     
-    def filter_urls(self, urls: List[str]) -> List[str]:
-        """Filter out problematic URLs that commonly block crawlers"""
+    async def filter_urls(self, urls: List[str]) -> List[str]:
+        """
+        Drop account pages and duplicate URLs, then let the domain stats skip
+        robots.txt-disallowed pages and unreliable domains and order the rest
+        by expected value per second
+        """
         filtered_urls = []
         
         for url in urls:
             try:
                 parsed = urlparse(url)
-                domain = parsed.netloc.lower()
-                
-                # Skip blocked domains
-                if domain in self.blocked_domains:
-                    print(f"Skipping blocked domain: {domain}")
+                if parsed.scheme not in ("http", "https") or not parsed.netloc:
+                    logger.info("Skipping non-web URL", extra={"url": url})
                     continue
-                    
-                # Skip URLs with suspicious patterns
-                if any(pattern in url.lower() for pattern in ['login', 'signin', 'register', 'auth', 'cart', 'checkout']):
-                    print(f"Skipping suspicious URL pattern: {url}")
+                
+                if is_account_page(url):
+                    logger.info("Skipping account page", extra={"url": url})
+                    URLS_SKIPPED.labels(reason="account_page").inc()
                     continue
                     
                 filtered_urls.append(url)
                 
             except Exception as e:
-                print(f"Error parsing URL {url}: {str(e)}")
+                logger.warning("Error parsing URL", extra={"url": url, "error": str(e)})
                 continue
                 
-        print(f"Filtered URLs: {len(urls)} -> {len(filtered_urls)}")
-        return filtered_urls
+        # Drop URLs naming the same page; the survivors are fetched as found, minus tracking params
+        unique_urls = dedupe_urls(filtered_urls)
+        DUPLICATES_DROPPED.labels(kind="url").inc(len(filtered_urls) - len(unique_urls))
+        
+        plan = await self.domain_stats.plan(unique_urls)
+        for reason in plan["skipped"].values():
+            URLS_SKIPPED.labels(reason=reason).inc()
+        if plan["skipped"]:
+            logger.info("Skipping URLs by domain history", extra={"skipped": plan["skipped"]})
+        if plan["probes"]:
+            logger.info("Probing unreliable domains", extra={"domains": plan["probes"]})
+        if ROBOTS_ENABLED:
+            self.refresh_robots(plan["stale_robots"], unique_urls)
+        
+        logger.info("Filtered URLs", extra={"urls_in": len(urls), "urls_out": len(plan["urls"])})
+        return plan["urls"]
+    
+    def refresh_robots(self, domains: List[str], urls: List[str]):
+        """Fetch stale or missing robots.txt files in the background; they apply from the next request"""
+        origins = {domain_of(url): f"{urlparse(url).scheme}://{domain_of(url)}" for url in urls}
+        
+        async def refresh(domain: str):
+            try:
+                await self.domain_stats.store_robots(domain, await self.crawler.fetch_robots(origins[domain]))
+            finally:
+                self.robots_refreshes.pop(domain, None)
+        
+        for domain in domains:
+            if domain in origins and domain not in self.robots_refreshes:
+                self.robots_refreshes[domain] = asyncio.create_task(refresh(domain))
+    
+    @staticmethod
+    def search_cache_key(query: str, max_results: int) -> str:
+        return f"{' '.join(query.lower().split())}|{max_results}"
     
     async def stage_1_search_urls(self, query: str, max_results: int = 10) -> List[str]:
         """Stage 1: Query search engines for top URLs with comprehensive fallback"""
-        # Try SearxNG first
+        cache_key = self.search_cache_key(query, max_results)
+        cached_urls = await self.cache.get("search", cache_key)
+        if cached_urls is not None:
+            logger.info("Stage 1 cache hit", extra={"query": query, "urls": len(cached_urls)})
+            return await self.filter_urls(cached_urls)
+        
+        # Hedged SearxNG / Google CSE query, merged and deduplicated
         try:
-            urls = await self.stage_1_search_urls_searxng(query, max_results)
-            return self.filter_urls(urls)
+            urls = await self.search.search(query, max_results)
+            # Cached before domain filtering so what the domain stats learn applies to cached results too
+            await self.cache.set("search", cache_key, urls, SEARCH_CACHE_TTL_SECS)
+            return await self.filter_urls(urls)
         except Exception as e:
-            print(f"SearxNG search failed: {str(e)}")
-            print("Falling back to Google Custom Search API...")
+            logger.warning("Search providers failed, using basic URL fallback", extra={"error": str(e)})
             
-            # Fallback to Google Custom Search
+            # Final fallback to basic URLs (not cached, so a recovered backend is used next time)
             try:
-                urls = await self.stage_1_search_urls_google(query, max_results)
-                return self.filter_urls(urls)
-            except Exception as google_e:
-                print(f"Google Custom Search also failed: {str(google_e)}")
-                print("Using basic URL fallback...")
-                
-                # Final fallback to basic URLs
-                try:
-                    urls = await self.stage_1_search_urls_fallback(query, max_results)
-                    return self.filter_urls(urls)
-                except Exception as fallback_e:
-                    print(f"All search methods failed: {str(fallback_e)}")
-                    raise HTTPException(
-                        status_code=500, 
-                        detail=f"All search methods failed. SearxNG: {str(e)}, Google: {str(google_e)}, Fallback: {str(fallback_e)}"
-                    )
-    
-    async def stage_2_fallback_crawl(self, urls: List[str]) -> List[Dict[str, Any]]:
-        """Fallback crawling method using direct HTTP requests with BeautifulSoup"""
-        documents = []
-        session = requests.Session()
-        
-        # Set session headers to look like a real browser
-        session.headers.update({
-            'User-Agent': random.choice(self.user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-        
-        for i, url in enumerate(urls):
-            try:
-                print(f"Fallback crawling {i+1}/{len(urls)}: {url}")
-                
-                # Add random delay to avoid being blocked
-                if i > 0:
-                    time.sleep(random.uniform(1, 3))
-                    
-                response = session.get(url, timeout=30)
-                response.raise_for_status()
-                
-                # Parse HTML content
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Remove script and style elements
-                for element in soup(["script", "style", "nav", "footer", "header"]):
-                    element.decompose()
-                
-                # Extract title
-                title_element = soup.find('title')
-                title = title_element.get_text().strip() if title_element else url
-                
-                # Extract readable text
-                content = soup.get_text(separator='\n', strip=True)
-                
-                # Clean up content
-                lines = [line.strip() for line in content.split('\n') if line.strip()]
-                clean_content = '\n'.join(lines)
-                
-                if clean_content and len(clean_content) > 100:  # Only include substantial content
-                    documents.append({
-                        "content": clean_content[:5000],  # Limit content length
-                        "url": url,
-                        "title": title,
-                        "loadedTime": time.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-                    })
-                    print(f"Successfully crawled: {title}")
-                else:
-                    print(f"Content too short, skipping: {url}")
-                    
-            except Exception as e:
-                print(f"Error crawling {url}: {str(e)}")
-                continue
-                
-        session.close()
-        print(f"Fallback crawl complete: {len(documents)}/{len(urls)} documents")
-        return documents
+                urls = await self.stage_1_search_urls_fallback(query, max_results)
+                return await self.filter_urls(urls)
+            except Exception as fallback_e:
+                logger.error("All search methods failed", extra={"error": str(fallback_e)})
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"All search methods failed. Providers: {str(e)}, Fallback: {str(fallback_e)}"
+                )
     
-    async def stage_2_crawl_content(self, urls: List[str]) -> List[Dict[str, Any]]:
-        """Stage 2: Use Apify to crawl and extract content from URLs"""
+    async def stage_2_fallback_crawl(
+        self,
+        urls: List[str],
+        on_document: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """Fallback crawling method using concurrent direct HTTP requests"""
+        logger.info("Fallback crawling URLs concurrently", extra={"urls": len(urls), "deadline_secs": CRAWL_DEADLINE_SECS})
+        with observe(BACKEND_LATENCY, backend="fallback_crawl"):
+            return await self.crawler.crawl(urls, deadline=CRAWL_DEADLINE_SECS, on_document=on_document)
+    
+    async def stage_2_crawl_content(
+        self,
+        urls: List[str],
+        on_document: Optional[Callable[[Dict[str, Any]], None]] = None,
+        crawl_uncached: Optional[Callable[..., Awaitable[List[Dict[str, Any]]]]] = None,
+        flights: Optional[SingleFlight] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Stage 2: Crawl content, reusing cached documents and crawling only the misses.
+        ``on_document`` is called once per document as soon as it is available.
+        ``crawl_uncached`` overrides how misses are fetched (default: Apify raced
+        against the direct crawler). ``flights`` is the coalescing group URLs are
+        claimed in (default: the interactive one).
+        """
+        crawl_uncached = crawl_uncached or self.stage_2_crawl_uncached
+        flights = flights or self.url_flights
+        reported_urls = set()
+        
+        def report(doc: Dict[str, Any]):
+            if on_document and doc["url"] not in reported_urls:
+                reported_urls.add(doc["url"])
+                on_document(doc)
+        
+        cached_documents = await asyncio.gather(*(self.cache.get("document", url) for url in urls))
+        documents_by_url = {url: doc for url, doc in zip(urls, cached_documents) if doc}
+        missing_urls = [url for url in urls if url not in documents_by_url]
+        logger.info("Document cache lookup", extra={"hits": len(documents_by_url), "misses": len(missing_urls)})
+        for doc in documents_by_url.values():
+            report(doc)
+        
+        # URLs another request is already crawling are awaited instead of fetched twice
+        owned_urls, shared_crawls = flights.claim(missing_urls)
+        owned = set(owned_urls)
+        released = set()
+        
+        def release(url: str, doc: Optional[Dict[str, Any]]):
+            # Resolve each owned URL exactly once so a later claim of the same URL is never popped
+            if url in owned and url not in released:
+                released.add(url)
+                flights.resolve(url, doc)
+        
         try:
-            documents = []
+            if shared_crawls:
+                logger.info("Joining crawls already in flight", extra={"shared": len(shared_crawls)})
             
-            # Prepare URLs for Apify Website Content Crawler
-            start_urls = [{"url": url} for url in urls]
+            extra_documents = []
             
-            # Configure Apify crawler with anti-blocking and strict limits
-            run_input = {
-                "startUrls": start_urls,
-                "maxCrawlPages": len(urls),
-                "crawlerType": "playwright:firefox",  # Firefox with stealth
-                "includeUrlGlobs": [],
-                "excludeUrlGlobs": [],
-                "ignoreCanonicalUrl": True,  # Skip canonical checks
-                "maxCrawlDepth": 0,  # Only crawl start URLs
-                "maxResults": len(urls),
-                "maxRequestsPerMinute": 60,  # Slower to avoid detection
-                "maxSessionPoolSize": 5,  # Fewer sessions
-                "maxSessionsPerCrawl": 3,  # Even fewer for stealth
-                "proxyConfiguration": {
-                    "useApifyProxy": True,
-                    "proxyCountryCode": "US"  # Use US proxies
-                },
-                "textContent": "readableText",  # Extract readable text
-                "saveHtml": False,
-                "saveMarkdown": False,
-                "saveScreenshots": False,
-                "maxScrollHeightPixels": 500,  # Minimal scrolling
-                "removeElementsCssSelector": "nav, footer, script, style, noscript, svg, .advertisement, .ads, .popup",
-                "requestTimeoutSecs": 45,  # Longer timeout for slow sites
-                "navigationTimeoutSecs": 45,  # Longer navigation timeout
-                "maxConcurrency": 2,  # Lower concurrency for stealth
-                "waitForSelector": "body",  # Wait for body to load
-                "waitForSelectorTimeoutMillis": 10000,  # 10 second wait
-                # Anti-blocking measures
-                "stealthMode": True,  # Enable stealth mode
-                "randomizeUserAgent": True,  # Randomize user agents
-                "blockResources": ["stylesheet", "image", "font", "media"],  # Block resources for speed
-                "skipLinkExtraction": True,  # Don't extract new links
-                # CRITICAL: Strict limits to prevent infinite loops
-                "maxRetryCount": 1,  # Only 1 retry per URL
-                "maxRequestRetries": 1,  # Only 1 retry per request
-                "maxRunTimeMinutes": 8,  # 8 minute absolute limit
-                # Handle failures gracefully
-                "ignoreSslErrors": True,
-                "ignoreHttpsErrors": True,
-                "ignoreCorsAndCsp": True,
-                # Additional anti-detection
-                "sessionRotationSecs": 300,  # Rotate sessions every 5 minutes
-                "maxSessionUsageCount": 3,  # Use each session max 3 times
-            }
+            def arrived(doc: Dict[str, Any]):
+                # Hand each page to waiting requests as soon as it lands, not when the whole crawl ends
+                release(doc["url"], doc)
+                report(doc)
             
-            # Run the Apify actor with timeout handling
-            print(f"Starting Apify crawl for {len(urls)} URLs with strict limits...")
-            run = self.apify_client.actor("apify/website-content-crawler").call(
-                run_input=run_input,
-                timeout_secs=600  # 10 minute absolute timeout
-            )
-            dataset_id = run["defaultDatasetId"]
-            
-            # Get dataset items
-            dataset_items = self.apify_client.dataset(dataset_id).list_items()
-            
-            # Process documents
-            for item in dataset_items.items:
-                content = item.get("readableText", item.get("text", item.get("markdown", "")))
-                if content and content.strip():
-                    documents.append({
-                        "content": content,
-                        "url": item.get("url", ""),
-                        "title": item.get("title", ""),
-                        "loadedTime": item.get("loadedTime", "")
-                    })
+            async def crawl_owned():
+                crawled_documents = []
+                try:
+                    crawled_documents = await crawl_uncached(owned_urls, on_document=arrived)
+                except HTTPException:
+                    if not documents_by_url and not shared_crawls:
+                        raise
+                    logger.warning("Crawling failed, continuing with cached documents", extra={"documents": len(documents_by_url)})
+                finally:
+                    crawled_by_url = {doc["url"]: doc for doc in crawled_documents}
+                    for url in owned_urls:
+                        release(url, crawled_by_url.get(url))
+                
+                for doc in crawled_documents:
+                    await self.cache.set("document", doc["url"], doc, DOCUMENT_CACHE_TTL_SECS)
+                    report(doc)
+                    if doc["url"] in owned and doc["url"] not in documents_by_url:
+                        documents_by_url[doc["url"]] = doc
+                    else:
+                        extra_documents.append(doc)
             
-            # Accept partial results - don't fail if we got some documents
-            total_urls = len(urls)
-            success_rate = len(documents) / total_urls if total_urls > 0 else 0
+            async def await_shared(url: str, crawl: asyncio.Future):
+                doc = await asyncio.shield(crawl)
+                if doc:
+                    documents_by_url[url] = doc
+                    report(doc)
             
-            print(f"Stage 2 Complete: Crawled {len(documents)}/{total_urls} documents ({success_rate:.1%} success rate)")
+            jobs = [await_shared(url, crawl) for url, crawl in shared_crawls.items()]
+            if owned_urls:
+                jobs.append(crawl_owned())
+            await asyncio.gather(*jobs)
+        finally:
+            # Cancelled before crawl_owned() ever ran: waiters must not hang on our claims
+            for url in owned_urls:
+                release(url, None)
+        
+        # Keep search ranking order, then anything the crawler returned under a different URL
+        return [documents_by_url[url] for url in urls if url in documents_by_url] + extra_documents
+    
+    async def stage_2_batch_crawl(
+        self,
+        urls: List[str],
+        on_document: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Stage 2 for batch jobs: cached like interactive crawls, but misses are
+        fetched only through the batch crawler's scheduler, which enforces global
+        and per-domain concurrency across the whole batch. URLs are coalesced in
+        a separate flight group so an interactive request never waits on a
+        URL queued behind a long batch crawl.
+        """
+        async def crawl_direct(missing_urls: List[str], on_document=None) -> List[Dict[str, Any]]:
+            return await self.batch_crawler.crawl(missing_urls, deadline=BATCH_CRAWL_DEADLINE_SECS, on_document=on_document)
+        
+        return await self.stage_2_crawl_content(
+            urls, on_document=on_document, crawl_uncached=crawl_direct, flights=self.batch_url_flights
+        )
+    
+    def apify_run_input(self, urls: List[str]) -> Dict[str, Any]:
+        """Apify Website Content Crawler input tuned for anti-blocking with strict limits"""
+        # Prepare URLs for Apify Website Content Crawler
+        start_urls = [{"url": url} for url in urls]
+        
+        # Configure Apify crawler with anti-blocking and strict limits
+        return {
+            "startUrls": start_urls,
+            "maxCrawlPages": len(urls),
+            "crawlerType": "playwright:firefox",  # Firefox with stealth
+            "includeUrlGlobs": [],
+            "excludeUrlGlobs": [],
+            "ignoreCanonicalUrl": True,  # Skip canonical checks
+            "maxCrawlDepth": 0,  # Only crawl start URLs
+            "maxResults": len(urls),
+            "maxRequestsPerMinute": 60,  # Slower to avoid detection
+            "maxSessionPoolSize": 5,  # Fewer sessions
+            "maxSessionsPerCrawl": 3,  # Even fewer for stealth
+            "proxyConfiguration": {
+                "useApifyProxy": True,
+                "proxyCountryCode": "US"  # Use US proxies
+            },
+            "textContent": "readableText",  # Extract readable text
+            "saveHtml": False,
+            "saveMarkdown": False,
+            "saveScreenshots": False,
+            "maxScrollHeightPixels": 500,  # Minimal scrolling
+            "removeElementsCssSelector": "nav, footer, script, style, noscript, svg, .advertisement, .ads, .popup",
+            "requestTimeoutSecs": 45,  # Longer timeout for slow sites
+            "navigationTimeoutSecs": 45,  # Longer navigation timeout
+            "maxConcurrency": 2,  # Lower concurrency for stealth
+            "waitForSelector": "body",  # Wait for body to load
+            "waitForSelectorTimeoutMillis": 10000,  # 10 second wait
+            # Anti-blocking measures
+            "stealthMode": True,  # Enable stealth mode
+            "randomizeUserAgent": True,  # Randomize user agents
+            "blockResources": ["stylesheet", "image", "font", "media"],  # Block resources for speed
+            "skipLinkExtraction": True,  # Don't extract new links
+            # CRITICAL: Strict limits to prevent infinite loops
+            "maxRetryCount": 1,  # Only 1 retry per URL
+            "maxRequestRetries": 1,  # Only 1 retry per request
+            "maxRunTimeMinutes": 8,  # 8 minute absolute limit
+            # Handle failures gracefully
+            "ignoreSslErrors": True,
+            "ignoreHttpsErrors": True,
+            "ignoreCorsAndCsp": True,
+            # Additional anti-detection
+            "sessionRotationSecs": 300,  # Rotate sessions every 5 minutes
+            "maxSessionUsageCount": 3,  # Use each session max 3 times
+        }
+    
+    @staticmethod
+    def apify_item_to_document(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        content = item.get("readableText", item.get("text", item.get("markdown", "")))
+        if not content or not content.strip():
+            return None
+        return {
+            "content": content,
+            "url": item.get("url", ""),
+            "title": item.get("title", ""),
+            "loadedTime": item.get("loadedTime", "")
+        }
+    
+    async def stage_2_harvest_apify(self, urls: List[str], accept: Callable[[Dict[str, Any]], None]):
+        """Start the Apify actor and pull its dataset items incrementally while it runs"""
+        with observe(BACKEND_LATENCY, backend="apify"):
+            await self._harvest_apify(urls, accept)
+    
+    async def _harvest_apify(self, urls: List[str], accept: Callable[[Dict[str, Any]], None]):
+        logger.info("Starting Apify crawl with strict limits", extra={"urls": len(urls)})
+        apify_client = self.clients.apify()
+        run = await apify_client.actor("apify/website-content-crawler").start(
+            run_input=self.apify_run_input(urls),
+            timeout_secs=APIFY_RUN_TIMEOUT_SECS
+        )
+        run_client = apify_client.run(run["id"])
+        dataset_client = apify_client.dataset(run["defaultDatasetId"])
+        offset = 0
+        finished = False
+        try:
+            while True:
+                # Read the status first so the final page read sees every item
+                status = ((await run_client.get()) or {}).get("status")
+                page = await dataset_client.list_items(offset=offset)
+                offset += len(page.items)
+                for item in page.items:
+                    doc = self.apify_item_to_document(item)
+                    domain = urlparse(item.get("url", "")).netloc.lower()
+                    CRAWL_RESULTS.labels(
+                        domain=domain,
+                        source="apify",
+                        outcome="ok" if doc else "skipped",
+                        error_class="" if doc else "empty",
+                    ).inc()
+                    if domain:
+                        # Apify reports no per-page timing, so only the outcome and yield are recorded
+                        await self.domain_stats.record(
+                            domain, doc is not None, content_chars=len(doc["content"]) if doc else 0, error_class="" if doc else "apify_empty"
+                        )
+                    accept(doc)
+                if status in APIFY_TERMINAL_STATUSES:
+                    finished = True
+                    logger.info("Apify run finished", extra={"run_id": run["id"], "status": status, "items": offset})
+                    return
+                await asyncio.sleep(APIFY_POLL_INTERVAL_SECS)
+        finally:
+            if not finished:
+                # Don't leave the actor burning compute once we stop reading from it
+                logger.info("Aborting Apify run", extra={"run_id": run["id"]})
+                try:
+                    await asyncio.shield(run_client.abort())
+                except Exception as e:
+                    logger.warning("Failed to abort Apify run", extra={"run_id": run["id"], "error": str(e)})
+    
+    async def stage_2_crawl_uncached(
+        self,
+        urls: List[str],
+        on_document: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Race an incrementally harvested Apify run against the direct HTTP crawler.
+        The first copy of each URL wins. Returns once CRAWL_QUORUM documents have
+        arrived (plus a short grace period for stragglers, cut short once every
+        URL has a document), every source is done, or CRAWL_HARVEST_DEADLINE_SECS
+        passes; whatever is still running is then cancelled and the Apify run
+        aborted.
+        
+        Pages already in the document store with validators are only refreshed
+        with conditional GETs through the direct crawler, never sent to Apify.
+        Without an Apify token the direct crawler runs alone.
+        """
+        loop = asyncio.get_running_loop()
+        documents_by_url: Dict[str, Dict[str, Any]] = {}
+        wins = {"apify": 0, "direct": 0, "revalidated": 0}
+        quorum = min(CRAWL_QUORUM, len(urls))
+        quorum_reached = asyncio.Event()
+        all_arrived = asyncio.Event()
+        
+        def accept(doc: Optional[Dict[str, Any]], source: str):
+            if not doc or not doc["url"] or doc["url"] in documents_by_url:
+                return
+            documents_by_url[doc["url"]] = doc
+            wins[source] += 1
+            if on_document:
+                on_document(doc)
+            if len(documents_by_url) >= quorum:
+                quorum_reached.set()
+            if len(documents_by_url) >= len(urls):
+                all_arrived.set()
+        
+        revalidate_urls = await self.document_store.revalidatable(urls)
+        fresh_urls = [url for url in urls if url not in revalidate_urls]
+        sources = {}
+        if revalidate_urls:
+            revalidation = self.stage_2_fallback_crawl(
+                [url for url in urls if url in revalidate_urls],
+                on_document=lambda doc: accept(doc, "revalidated")
+            )
+            sources[asyncio.create_task(revalidation)] = "revalidation"
+        if fresh_urls and self.clients.apify_configured:
+            sources[asyncio.create_task(self.stage_2_harvest_apify(fresh_urls, lambda doc: accept(doc, "apify")))] = "Apify"
+        if fresh_urls:
+            sources[asyncio.create_task(self.stage_2_fallback_crawl(fresh_urls, on_document=lambda doc: accept(doc, "direct")))] = "direct crawl"
+        quorum_wait = asyncio.create_task(quorum_reached.wait())
+        all_arrived_wait = asyncio.create_task(all_arrived.wait())
+        deadline_at = loop.time() + CRAWL_HARVEST_DEADLINE_SECS
+        pending = set(sources)
+        
+        async def wait_sources(until: float, stop: asyncio.Event, stop_wait: asyncio.Task):
+            while pending and not stop.is_set() and loop.time() < until:
+                done, _ = await asyncio.wait(
+                    pending | {stop_wait},
+                    timeout=until - loop.time(),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done & pending:
+                    pending.discard(task)
+                    if task.exception():
+                        logger.warning("Stage 2 source failed", extra={"source": sources[task], "error": str(task.exception())})
+        
+        try:
+            await wait_sources(deadline_at, quorum_reached, quorum_wait)
+            if quorum_reached.is_set():
+                # Let pages that are nearly done land before synthesis starts, but stop
+                # as soon as every URL has a document (e.g. while Apify is still running)
+                await wait_sources(min(loop.time() + CRAWL_QUORUM_GRACE_SECS, deadline_at), all_arrived, all_arrived_wait)
+        finally:
+            for task in (quorum_wait, all_arrived_wait, *sources):
+                task.cancel()
+            await asyncio.gather(quorum_wait, all_arrived_wait, *sources, return_exceptions=True)
+        
+        total_urls = len(urls)
+        success_rate = len(documents_by_url) / total_urls if total_urls > 0 else 0
+        logger.info("Stage 2 complete", extra={
+            "documents": len(documents_by_url),
+            "urls": total_urls,
+            "success_rate": round(success_rate, 3),
+            "apify_wins": wins["apify"],
+            "direct_wins": wins["direct"],
+            "revalidated": wins["revalidated"],
+        })
+        
+        if not documents_by_url:
+            raise HTTPException(status_code=500, detail=f"All crawling methods failed to extract content from {total_urls} URLs")
+        
+        return [documents_by_url[url] for url in urls if url in documents_by_url] + [
+            doc for url, doc in documents_by_url.items() if url not in urls
+        ]
+    
+    def rank_passages(self, query: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        BM25 ranking, optionally followed by semantic reranking of the top
+        candidates, then removal of chunks that near-duplicate a better one
+        """
+        ranked = rank_chunks(query, chunks)
+        if self.reranker and ranked:
+            # Rerank only chunks that matched lexically (unless nothing did)
+            candidates = [chunk for chunk in ranked[:RERANK_CANDIDATES] if chunk["score"] > 0] or ranked[:RERANK_CANDIDATES]
+            ranked = self.reranker.rerank(query, candidates)
+        
+        unique = dedupe_chunks(ranked, DEDUP_CHUNK_MAX_DISTANCE)
+        DUPLICATES_DROPPED.labels(kind="chunk").inc(len(ranked) - len(unique))
+        return unique
+    
+    async def stage_3_retrieve(self, query: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Stage 3a: Chunk every crawled document, rank the chunks with BM25 against
+        the query (plus semantic reranking when enabled) and pack the best ones
+        into the synthesis token budget. Returns the selected passages grouped per
+        source document, with sources ordered by their best-scoring chunk.
+        """
+        chunks = chunk_documents(documents, self.chunk_size, self.chunk_overlap)
+        ranked = await self.executor.run(self.rank_passages, query, chunks)
+        selected = pack_chunks(ranked, SYNTHESIS_TOKEN_BUDGET)
+        
+        passages_by_doc: Dict[int, List[Dict[str, Any]]] = {}
+        for chunk in selected:
+            passages_by_doc.setdefault(chunk["doc_index"], []).append(chunk)
+        
+        logger.info("Stage 3a complete", extra={
+            "selected_chunks": len(selected),
+            "total_chunks": len(chunks),
+            "source_documents": len(passages_by_doc),
+            "documents": len(documents),
+        })
+        return {
+            "sources": [
+                {"document": documents[doc_index], "passages": passages}
+                for doc_index, passages in passages_by_doc.items()
+            ],
+            "total_chunks": len(chunks)
+        }
+    
+    async def build_synthesis_prompt(self, query: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Assemble the Gemini prompt along with the citations and sources it draws on"""
+        if not documents:
+            raise ValueError("No documents available for synthesis")
+        
+        # Mirrored and syndicated pages would spend the token budget on the same text twice
+        distinct_documents = await self.executor.run(dedupe_documents, documents, DEDUP_DOCUMENT_MAX_DISTANCE)
+        if len(distinct_documents) < len(documents):
+            DUPLICATES_DROPPED.labels(kind="document").inc(len(documents) - len(distinct_documents))
+            logger.info("Dropped near-duplicate documents", extra={"documents": len(documents), "distinct": len(distinct_documents)})
+        
+        retrieved = await self.stage_3_retrieve(query, distinct_documents)
+        
+        # Combine the retrieved passages, in page order within each source
+        combined_content = ""
+        sources = []
+        citations = []
+        
+        for i, source in enumerate(retrieved["sources"]):
+            doc = source["document"]
+            passages = sorted(source["passages"], key=lambda chunk: chunk["chunk_index"])
+            content = "\n...\n".join(chunk["text"] for chunk in passages)
+            url = doc.get("url", "")
+            title = doc.get("title", "")
             
-            # Only fail if we got NO documents at all
-            if len(documents) == 0:
-                raise Exception(f"Failed to crawl any content from {total_urls} URLs")
-                
-            # Success if we got at least some documents (even if not all)
-            if len(documents) < total_urls:
-                print(f"Warning: Only {len(documents)} out of {total_urls} URLs were successfully crawled")
-                
-            return documents
+            combined_content += f"\n\n--- Source {i+1}: {title} ---\n{content}"
+            if url:
+                sources.append(url)
             
-        except Exception as e:
-            print(f"Error in Stage 2 - Apify crawling: {str(e)}")
-            # If we have some documents but got an error, try to continue with what we have
-            if documents and len(documents) > 0:
-                print(f"Continuing with {len(documents)} successfully crawled documents despite error")
-                return documents
-            else:
-                print("Apify crawling failed completely, trying fallback method...")
-                try:
-                    # Try fallback crawling method
-                    fallback_documents = await self.stage_2_fallback_crawl(urls)
-                    if fallback_documents:
-                        print(f"Fallback crawling succeeded with {len(fallback_documents)} documents")
-                        return fallback_documents
-                    else:
-                        raise HTTPException(status_code=500, detail=f"Both Apify and fallback crawling failed: {str(e)}")
-                except Exception as fallback_e:
-                    print(f"Fallback crawling also failed: {str(fallback_e)}")
-                    raise HTTPException(status_code=500, detail=f"All crawling methods failed. Apify: {str(e)}, Fallback: {str(fallback_e)}")
+            # Cite the passage that ranked highest for this source
+            best_passage = source["passages"][0]["text"]
+            citations.append({
+                "id": i + 1,
+                "url": url,
+                "title": doc.get("title", "Untitled Source"),
+                "snippet": best_passage[:200] + "..." if len(best_passage) > 200 else best_passage
+            })
+        
+        # Create synthesis prompt
+        prompt = f"""
+        Based on the following sources, provide a comprehensive answer to this question: {query}
+        
+        Requirements:
+        1. Synthesize information from multiple sources
+        2. Provide specific details and examples
+        3. Structure your response clearly
+        4. Mention which sources support key points
+        
+        Sources:
+        {combined_content}
+        
+        Question: {query}
+        
+        Please provide a detailed, well-structured answer:
+        """
+        
+        prompt_tokens = estimate_tokens(prompt)
+        PROMPT_CHARS.observe(len(prompt))
+        PROMPT_TOKENS.observe(prompt_tokens)
+        logger.info("Synthesis prompt built", extra={"prompt_chars": len(prompt), "prompt_tokens": prompt_tokens, "sources": len(citations)})
+        return {
+            "prompt": prompt,
+            "citations": citations,
+            "sources": sources,
+            "total_documents": len(documents),
+            "total_chunks": retrieved["total_chunks"]
+        }
+    
+    def gemini_model(self):
+        try:
+            return self.clients.gemini()
+        except ClientUnavailable as e:
+            raise HTTPException(status_code=503, detail=f"RAG synthesis unavailable: {str(e)}")
     
     async def stage_3_rag_synthesis(self, query: str, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Stage 3: AI synthesis with Google Gemini"""
+        model = self.gemini_model()
         try:
-            if not documents:
-                raise ValueError("No documents available for synthesis")
-            
-            # Combine all document content
-            combined_content = ""
-            sources = []
-            
-            for i, doc in enumerate(documents[:5]):  # Limit to top 5 documents
-                content = doc.get("content", "")[:2000]  # Limit content length
-                url = doc.get("url", "")
-                title = doc.get("title", "")
-                
-                combined_content += f"\n\n--- Source {i+1}: {title} ---\n{content}"
-                if url:
-                    sources.append(url)
-            
-            # Create synthesis prompt
-            prompt = f"""
-            Based on the following sources, provide a comprehensive answer to this question: {query}
-            
-            Requirements:
-            1. Synthesize information from multiple sources
-            2. Provide specific details and examples
-            3. Structure your response clearly
-            4. Mention which sources support key points
-            
-            Sources:
-            {combined_content}
-            
-            Question: {query}
-            
-            Please provide a detailed, well-structured answer:
-            """
+            synthesis = await self.build_synthesis_prompt(query, documents)
             
             # Generate response with Gemini
-            response = model.generate_content(prompt)
-            answer = response.text
-            
-            # Create citations
-            citations = []
-            for i, doc in enumerate(documents[:5]):
-                citations.append({
-                    "id": i + 1,
-                    "url": doc.get("url", ""),
-                    "title": doc.get("title", "Untitled Source"),
-                    "snippet": doc.get("content", "")[:200] + "..." if len(doc.get("content", "")) > 200 else doc.get("content", "")
-                })
+            with observe(BACKEND_LATENCY, backend="gemini"):
+                response = await model.generate_content_async(synthesis["prompt"])
+                answer = response.text
             
             result = {
                 "answer": answer,
-                "citations": citations,
-                "sources": sources,
-                "total_documents": len(documents),
-                "total_chunks": len(documents)
+                "citations": synthesis["citations"],
+                "sources": synthesis["sources"],
+                "total_documents": synthesis["total_documents"],
+                "total_chunks": synthesis["total_chunks"]
             }
             
-            print(f"Stage 3 Complete: Generated synthesis with {len(citations)} citations")
+            logger.info("Stage 3 complete", extra={"citations": len(result["citations"])})
             return result
             
         except Exception as e:
-            print(f"Error in Stage 3 - RAG synthesis: {str(e)}")
+            logger.exception("Error in Stage 3 - RAG synthesis")
+            raise HTTPException(status_code=500, detail=f"RAG synthesis failed: {str(e)}")
+    
+    async def stage_3_rag_synthesis_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stage 3 (streaming): yield Gemini output text as it is generated"""
+        model = self.gemini_model()
+        try:
+            with observe(BACKEND_LATENCY, backend="gemini"):
+                response = await model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunks without text parts (e.g. safety metadata) carry nothing to forward
+                        continue
+                    if text:
+                        yield text
+        except Exception as e:
+            logger.exception("Error in Stage 3 - streaming synthesis")
             raise HTTPException(status_code=500, detail=f"RAG synthesis failed: {str(e)}")
 
+    async def warmup(self):
+        """Open pooled connections and start extraction workers ahead of the first request"""
+        started = time.perf_counter()
+        
+        async def warm_searxng():
+            try:
+                await self.search_client.get(SEARXNG_BASE_URL)
+            except httpx.HTTPError as e:
+                logger.warning("SearxNG warmup failed", extra={"error": str(e)})
+        
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(warm_searxng(), self.extractor.warmup()),
+                timeout=CLIENT_WARMUP_TIMEOUT_SECS
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Warmup timed out", extra={"timeout_secs": CLIENT_WARMUP_TIMEOUT_SECS})
+        logger.info("Warmup complete", extra={"duration_secs": round(time.perf_counter() - started, 3)})
+
 # Initialize pipeline
 rag_pipeline = RAGPipeline()
 
+# Set once startup has built the clients and warmed the pools
+startup_state: Dict[str, Any] = {"started": False, "startup_secs": None}
+
+async def start_pipeline():
+    """Build every configured backend client once for this worker, then warm connection pools"""
+    started = time.perf_counter()
+    await rag_pipeline.clients.start(rag_pipeline.executor)
+    await rag_pipeline.warmup()
+    startup_state.update(started=True, startup_secs=round(time.perf_counter() - started, 3))
+    logger.info("Startup complete", extra={"startup_secs": startup_state["startup_secs"]})
+
+async def close_pipeline():
+    """Release pooled HTTP connections and executor threads on shutdown"""
+    for task in list(rag_pipeline.robots_refreshes.values()):
+        task.cancel()
+    await rag_pipeline.crawler.aclose()
+    await rag_pipeline.batch_crawler.aclose()
+    await rag_pipeline.search_client.aclose()
+    rag_pipeline.cache.close()
+    rag_pipeline.document_store.close()
+    rag_pipeline.domain_stats.close()
+    if rag_pipeline.answer_cache:
+        rag_pipeline.answer_cache.close()
+    if rag_pipeline.reranker:
+        rag_pipeline.reranker.store.close()
+    rag_pipeline.executor.shutdown()
+    rag_pipeline.search_executor.shutdown()
+    rag_pipeline.extractor.shutdown()
+
+def route_label(request: Request) -> str:
+    """Route template (e.g. /research/batch/{job_id}) so metric labels stay low-cardinality"""
+    for route in app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+class RequestTracing:
+    """
+    Tag each request with a trace ID (X-Request-ID if supplied) and count it as
+    in flight until its response body has been sent. A plain ASGI middleware, so
+    streamed responses stay counted while they stream.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        trace_id = request.headers.get("x-request-id") or new_trace_id()
+        
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = trace_id
+            await send(message)
+        
+        token = trace_id_var.set(trace_id)
+        inflight = INFLIGHT_REQUESTS.labels(endpoint=route_label(request))
+        inflight.inc()
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        finally:
+            inflight.dec()
+            trace_id_var.reset(token)
+
+app.add_middleware(RequestTracing)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage and per-backend latency, crawl outcomes, prompt sizes"""
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+# Coalesces identical /research requests that arrive while one is in flight
+research_flights = SingleFlight("research")
+
+# Caps concurrent pipelines, queues the overflow by priority and rate-limits each client
+admission = AdmissionController(
+    max_concurrent=ADMISSION_MAX_CONCURRENT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECS,
+    client_rate_per_min=CLIENT_RATE_PER_MIN,
+    client_burst=CLIENT_BURST,
+)
+
+def is_trusted_proxy(http_request: Request) -> bool:
+    """Whether the caller may speak for its own clients: a TRUSTED_PROXY_IPS address or the proxy secret"""
+    secret = http_request.headers.get("x-proxy-secret")
+    if PROXY_SHARED_SECRET and secret and secrets.compare_digest(secret, PROXY_SHARED_SECRET):
+        return True
+    return http_request.client is not None and http_request.client.host in TRUSTED_PROXY_IPS
+
+def client_identity(http_request: Request) -> str:
+    """
+    Rate-limit key: the X-Client-ID header when a trusted proxy sent it, else
+    the caller's address, so direct callers cannot rotate the header for fresh buckets
+    """
+    peer = http_request.client.host if http_request.client else "unknown"
+    client_id = http_request.headers.get("x-client-id")
+    if client_id and is_trusted_proxy(http_request):
+        return client_id
+    return peer
+
+def request_priority(http_request: Request) -> str:
+    """Priority class from the X-Priority header ("interactive" by default, or "batch")"""
+    priority = http_request.headers.get("x-priority", INTERACTIVE).lower()
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"X-Priority must be one of {', '.join(PRIORITIES)}")
+    return priority
+
 @app.post("/research", response_model=SearchResponse)
-async def research_endpoint(request: SearchRequest):
+async def research_endpoint(request: SearchRequest, http_request: Request, http_response: Response):
     """
-    Main research endpoint that executes the three-stage RAG pipeline
+    Main research endpoint that executes the three-stage RAG pipeline.
+    Identical concurrent requests share one pipeline run. Requests beyond the
+    client's rate limit, or arriving while the wait queue is full, get 429 with
+    Retry-After.
+    
+    Repeated or paraphrased queries are answered from the answer cache unless
+    ``bypass_cache`` is set; ``X-Answer-Cache`` reports hit, miss or bypass.
     """
+    priority = request_priority(http_request)
+    admission.check_rate(client_identity(http_request), priority)
+    
+    cache_status, cached = await lookup_answer(request)
+    http_response.headers["X-Answer-Cache"] = cache_status
+    if cached:
+        return cached
+    
+    async def admitted_pipeline() -> SearchResponse:
+        async with admission.slot(priority):
+            response = await run_research_pipeline(request)
+        await store_answer(request, response)
+        return response
+    
+    flight_key = rag_pipeline.search_cache_key(request.query, request.max_results)
+    response = await research_flights.do(flight_key, admitted_pipeline)
+    return response.model_copy(update={"query": request.query})
+
+async def lookup_answer(request: SearchRequest) -> tuple:
+    """("hit", response) from the answer cache, else ("miss" | "bypass", None)"""
+    answer_cache = rag_pipeline.answer_cache
+    if answer_cache is None:
+        return "miss", None
+    if request.bypass_cache:
+        answer_cache.record_bypass()
+        return "bypass", None
+    match = await answer_cache.get(request.query, request.max_results)
+    if match is None:
+        return "miss", None
+    return "hit", SearchResponse(**{**match["response"], "query": request.query})
+
+async def store_answer(request: SearchRequest, response: SearchResponse):
+    if rag_pipeline.answer_cache:
+        await rag_pipeline.answer_cache.put(request.query, request.max_results, response.model_dump())
+
+async def run_research_pipeline(request: SearchRequest) -> SearchResponse:
+    """Execute stages 1-3 for a single request"""
     try:
-        print(f"Starting research pipeline for query: {request.query}")
+        logger.info("Starting research pipeline", extra={"query": request.query})
         
         # Stage 1: Search for URLs
-        urls = await rag_pipeline.stage_1_search_urls(request.query, request.max_results)
+        urls = await run_stage(
+            "search",
+            rag_pipeline.stage_1_search_urls(request.query, request.max_results),
+            STAGE_1_TIMEOUT_SECS
+        )
         
         if not urls:
             raise HTTPException(status_code=404, detail="No relevant URLs found")
         
         # Stage 2: Crawl content (accept partial results)
-        documents = await rag_pipeline.stage_2_crawl_content(urls)
+        documents = await run_stage(
+            "crawl",
+            rag_pipeline.stage_2_crawl_content(urls),
+            STAGE_2_TIMEOUT_SECS
+        )
         
         if not documents:
             raise HTTPException(status_code=500, detail="No content could be extracted from any URLs")
         
         # Stage 3: RAG synthesis
-        synthesis_result = await rag_pipeline.stage_3_rag_synthesis(request.query, documents)
+        synthesis_result = await run_stage(
+            "synthesis",
+            rag_pipeline.stage_3_rag_synthesis(request.query, documents),
+            STAGE_3_TIMEOUT_SECS
+        )
         
         # Prepare response
         response = SearchResponse(
@@ -466,15 +1156,243 @@ async def research_endpoint(request: SearchRequest):
             sources=synthesis_result["sources"]
         )
         
-        print(f"Research pipeline completed successfully")
+        logger.info("Research pipeline completed")
         return response
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Unexpected error in research pipeline: {str(e)}")
+        logger.exception("Unexpected error in research pipeline")
         raise HTTPException(status_code=500, detail=f"Research pipeline failed: {str(e)}")
 
+# Background batch research jobs
+batch_manager = BatchJobManager(
+    search=rag_pipeline.stage_1_search_urls,
+    crawl=rag_pipeline.stage_2_batch_crawl,
+    synthesize=rag_pipeline.stage_3_rag_synthesis,
+    cache=rag_pipeline.cache,
+    synthesis_rpm=BATCH_SYNTHESIS_RPM,
+    job_ttl_secs=BATCH_JOB_TTL_SECS,
+    admission=admission,
+    synthesis_timeout=STAGE_3_TIMEOUT_SECS,
+)
+
+@app.post("/research/batch", status_code=202)
+async def research_batch_endpoint(request: BatchRequest, http_request: Request):
+    """
+    Submit many research queries as one background job. URLs shared between
+    queries are crawled once and answers are synthesized at batch priority;
+    poll GET /research/batch/{job_id} for progress and results.
+    """
+    admission.check_rate(client_identity(http_request), BATCH)
+    if not request.requests:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one request")
+    if len(request.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_REQUESTS} requests")
+    
+    job = await batch_manager.submit([r.model_dump() for r in request.requests])
+    logger.info("Batch accepted", extra={"job_id": job.id, "queries": len(request.requests)})
+    return {"job_id": job.id, "status": job.status, "queries": len(request.requests)}
+
+@app.get("/research/batch/{job_id}")
+async def research_batch_status(job_id: str):
+    """Progress counters and per-query results (answer or error) for a batch job"""
+    job = await batch_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Batch job {job_id} not found")
+    return job
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/research/stream")
+async def research_stream_endpoint(request: SearchRequest, http_request: Request):
+    """
+    Streaming variant of /research using Server-Sent Events.
+    
+    Emits ``urls`` once search completes, one ``document`` per crawled page,
+    ``citations`` before synthesis starts, ``token`` for each chunk of the
+    Gemini answer, and finally ``done`` with the full SearchResponse payload
+    (or ``error`` with a status code and detail).
+    
+    Rate-limit and full-queue rejections are plain 429 responses; a queued
+    request's stream stays open and its events start once it is admitted.
+    An answer cache hit skips straight to ``citations``, one ``token`` with the
+    whole answer, and ``done``.
+    """
+    priority = request_priority(http_request)
+    admission.check_rate(client_identity(http_request), priority)
+    cache_status, cached = await lookup_answer(request)
+    if not cached:
+        admission.check_capacity(priority)
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def pipeline():
+        logger.info("Starting streaming research pipeline", extra={"query": request.query})
+        urls = await run_stage(
+            "search",
+            rag_pipeline.stage_1_search_urls(request.query, request.max_results),
+            STAGE_1_TIMEOUT_SECS
+        )
+        if not urls:
+            raise HTTPException(status_code=404, detail="No relevant URLs found")
+        events.put_nowait(("urls", {"urls": urls}))
+        
+        def on_document(doc: Dict[str, Any]):
+            events.put_nowait(("document", {
+                "url": doc.get("url", ""),
+                "title": doc.get("title", ""),
+                "snippet": doc.get("content", "")[:200]
+            }))
+        
+        documents = await run_stage(
+            "crawl",
+            rag_pipeline.stage_2_crawl_content(urls, on_document=on_document),
+            STAGE_2_TIMEOUT_SECS
+        )
+        if not documents:
+            raise HTTPException(status_code=500, detail="No content could be extracted from any URLs")
+        
+        synthesis = await rag_pipeline.build_synthesis_prompt(request.query, documents)
+        events.put_nowait(("citations", {"citations": synthesis["citations"], "sources": synthesis["sources"]}))
+        
+        async def stream_answer() -> str:
+            parts = []
+            async for text in rag_pipeline.stage_3_rag_synthesis_stream(synthesis["prompt"]):
+                parts.append(text)
+                events.put_nowait(("token", {"text": text}))
+            return "".join(parts)
+        
+        answer = await run_stage("synthesis", stream_answer(), STAGE_3_TIMEOUT_SECS)
+        response = SearchResponse(
+            query=request.query,
+            answer=answer,
+            citations=synthesis["citations"],
+            sources=synthesis["sources"]
+        )
+        events.put_nowait(("done", response.model_dump()))
+        logger.info("Streaming research pipeline completed")
+        await store_answer(request, response)
+    
+    async def produce():
+        try:
+            if cached:
+                events.put_nowait(("citations", {"citations": cached.citations, "sources": cached.sources}))
+                events.put_nowait(("token", {"text": cached.answer}))
+                events.put_nowait(("done", cached.model_dump()))
+                return
+            async with admission.slot(priority):
+                await pipeline()
+        except HTTPException as e:
+            events.put_nowait(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            logger.exception("Unexpected error in streaming research pipeline")
+            events.put_nowait(("error", {"status_code": 500, "detail": f"Research pipeline failed: {str(e)}"}))
+        finally:
+            events.put_nowait(None)
+    
+    async def event_stream():
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield format_sse(*event)
+        finally:
+            # Stop the pipeline if the client disconnects mid-stream
+            producer.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Answer-Cache": cache_status}
+    )
+
+def is_loopback(http_request: Request) -> bool:
+    try:
+        return http_request.client is not None and ipaddress.ip_address(http_request.client.host).is_loopback
+    except ValueError:
+        return False
+
+def require_admin(http_request: Request, admin_token: Optional[str]):
+    """
+    Reject admin calls whose X-Admin-Token does not match ADMIN_API_TOKEN.
+    Without a configured token, admin routes only answer loopback clients.
+    """
+    if ADMIN_API_TOKEN:
+        if not admin_token or not secrets.compare_digest(admin_token, ADMIN_API_TOKEN):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+    elif not is_loopback(http_request):
+        raise HTTPException(status_code=403, detail="ADMIN_API_TOKEN is not set; admin routes are limited to localhost")
+
+@app.get("/admin/cache")
+async def cache_stats(http_request: Request, x_admin_token: Optional[str] = Header(None)):
+    """Cache hit/miss counters per namespace, plus document store, answer cache and embedding store reuse"""
+    require_admin(http_request, x_admin_token)
+    stats = rag_pipeline.cache.stats()
+    stats["document_store"] = await rag_pipeline.document_store.stats()
+    if rag_pipeline.answer_cache:
+        stats["answer_cache"] = await rag_pipeline.answer_cache.stats()
+    if rag_pipeline.reranker:
+        stats["embedding_store"] = await rag_pipeline.executor.run(rag_pipeline.reranker.store.stats)
+    return stats
+
+@app.delete("/admin/cache")
+async def invalidate_cache(
+    http_request: Request,
+    namespace: Optional[str] = None,
+    key: Optional[str] = None,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Invalidate cache entries. Filter by namespace ("search", "document" or "answer")
+    and/or key (a URL for documents); with no filters the whole cache, answers
+    included, is cleared.
+    """
+    require_admin(http_request, x_admin_token)
+    removed = 0
+    if namespace in (None, "answer") and key is None and rag_pipeline.answer_cache:
+        removed += await rag_pipeline.answer_cache.clear()
+    if namespace != "answer":
+        removed += await rag_pipeline.cache.invalidate(namespace, key)
+    logger.info("Cache invalidated", extra={"namespace": namespace, "key": key, "removed": removed})
+    return {"removed": removed, "namespace": namespace, "key": key}
+
+@app.get("/admin/domains")
+async def domain_stats(http_request: Request, limit: int = 50, x_admin_token: Optional[str] = Header(None)):
+    """Per-domain success rate, median latency, content yield and skip state, worst domains first"""
+    require_admin(http_request, x_admin_token)
+    return await rag_pipeline.domain_stats.stats(limit)
+
+@app.delete("/admin/domains")
+async def reset_domain_stats(http_request: Request, domain: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """Forget the crawl history (and cached robots.txt) of one domain, or of all domains"""
+    require_admin(http_request, x_admin_token)
+    removed = await rag_pipeline.domain_stats.reset(domain)
+    logger.info("Domain stats reset", extra={"domain": domain, "removed": removed})
+    return {"removed": removed, "domain": domain}
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once startup has built the clients and the synthesis
+    backend is usable, else 503. Unlike /health this fails while the worker is
+    still starting or when Gemini cannot be used.
+    """
+    clients = rag_pipeline.clients.status()
+    ready = startup_state["started"] and clients["gemini"]["ready"]
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "started": startup_state["started"],
+            "startup_secs": startup_state["startup_secs"],
+            "clients": clients,
+        }
+    )
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -482,7 +1400,14 @@ async def health_check():
         "status": "healthy",
         "searxng_url": SEARXNG_BASE_URL,
         "google_api_configured": bool(GOOGLE_API_KEY),
-        "apify_api_configured": bool(APIFY_API_TOKEN)
+        "apify_api_configured": bool(APIFY_API_TOKEN),
+        "search_providers": rag_pipeline.search.stats(),
+        "admission": admission.stats(),
+        "coalescing": {
+            "research": research_flights.stats(),
+            "crawl": rag_pipeline.url_flights.stats(),
+            "batch_crawl": rag_pipeline.batch_url_flights.stats()
+        }
     }
 
 if __name__ == "__main__":
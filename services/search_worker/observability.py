@@ -0,0 +1,148 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+# Trace ID of the request being handled; copied into every task the request spawns
+trace_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed via ``extra=`` and is logged as a field
+_RESERVED_LOG_ATTRS = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with timestamp, level, logger, trace ID and any extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        trace_id = trace_id_var.get()
+        if trace_id:
+            entry["trace_id"] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_LOG_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = "INFO"):
+    """Send all log records to stdout as JSON lines"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+    # One line per outbound request is too chatty next to the crawl logs
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+# Metrics
+
+STAGE_LATENCY = Histogram(
+    "research_stage_duration_seconds",
+    "Wall time of each research pipeline stage",
+    ["stage", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 240),
+)
+BACKEND_LATENCY = Histogram(
+    "research_backend_duration_seconds",
+    "Latency of calls to external backends (SearxNG, Google CSE, Apify, fallback crawl, Gemini)",
+    ["backend", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 240),
+)
+CRAWL_RESULTS = Counter(
+    "research_crawl_results_total",
+    "Crawled pages by domain, source and outcome",
+    ["domain", "source", "outcome", "error_class"],
+)
+PROMPT_CHARS = Histogram(
+    "research_prompt_chars",
+    "Size of the synthesis prompt in characters",
+    buckets=(1000, 2000, 4000, 8000, 12000, 16000, 24000, 32000, 64000),
+)
+PROMPT_TOKENS = Histogram(
+    "research_prompt_tokens",
+    "Estimated size of the synthesis prompt in tokens",
+    buckets=(250, 500, 1000, 2000, 3000, 4000, 6000, 8000, 16000),
+)
+INFLIGHT_REQUESTS = Gauge(
+    "research_inflight_requests",
+    "Requests currently being handled, per endpoint",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+DUPLICATES_DROPPED = Counter(
+    "research_duplicates_dropped_total",
+    "URLs, documents and chunks dropped as duplicates before crawling or synthesis",
+    ["kind"],
+)
+URLS_SKIPPED = Counter(
+    "research_urls_skipped_total",
+    "Search result URLs not crawled: account pages, robots.txt disallows, unreliable domains",
+    ["reason"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "research_admission_queue_depth",
+    "Pipelines waiting for an admission slot, per priority class",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT = Histogram(
+    "research_admission_wait_seconds",
+    "Time spent queued before a pipeline was admitted",
+    ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+ADMISSION_REJECTED = Counter(
+    "research_admission_rejected_total",
+    "Requests turned away by admission control",
+    ["priority", "reason"],
+)
+
+
+@contextmanager
+def observe(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """Time the block into ``histogram``, labelling it with outcome=ok|error|timeout|cancelled"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            outcome = "cancelled"
+        elif isinstance(e, asyncio.TimeoutError):
+            outcome = "timeout"
+        else:
+            outcome = "error"
+        raise
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> tuple:
+    """Prometheus exposition text; aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from retrieval import tokenize
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class HashingEmbedder:
+    """CPU-only text embeddings from hashed unigram and bigram features.
+
+    Each feature is hashed into one of ``dim`` buckets with a hashed sign,
+    weighted by log term frequency, and the vector is L2-normalised. Uses a
+    stable hash (not Python's salted ``hash``) so vectors are identical across
+    processes and restarts, which is what makes them safe to persist.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hash{dim}"
+
+    def _features(self, text: str) -> Dict[int, float]:
+        tokens = tokenize(text)
+        features: Dict[int, float] = {}
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = digest % self.dim
+            sign = 1.0 if (digest >> 63) & 1 else -1.0
+            features[bucket] = features.get(bucket, 0.0) + sign
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into a (len(texts), dim) float32 matrix"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if features:
+                buckets = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+                counts = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+                vectors[row, buckets] = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class EmbeddingStore:
+    """Persistent embedding cache: vectors in a memory-mapped array, keyed by content hash.
+
+    Vectors live in a flat float32 file that grows in ``growth_rows`` steps and
+    is mapped with ``numpy.memmap``. A SQLite table maps content hashes to rows;
+    a row only becomes visible once its vector has been written, so several
+    workers can share the same files.
+    """
+
+    def __init__(self, directory: str, embedder_name: str, dim: int, growth_rows: int = 4096):
+        self.dim = dim
+        self.growth_rows = growth_rows
+        self.vectors_path = os.path.join(directory, f"embeddings-{embedder_name}.f32")
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.memmap] = None
+        self._db = sqlite3.connect(os.path.join(directory, f"embeddings-{embedder_name}.db"), timeout=10, check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, row INTEGER UNIQUE, ready INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _capacity(self) -> int:
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self.dim * 4)
+
+    def _mapped(self, min_rows: int) -> np.memmap:
+        """Return a mapping covering at least ``min_rows`` rows, growing the file if needed"""
+        capacity = self._capacity()
+        if capacity < min_rows:
+            capacity = ((min_rows // self.growth_rows) + 1) * self.growth_rows
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * self.dim * 4)
+        if self._vectors is None or self._vectors.shape[0] < min_rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        return self._vectors
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        if not hashes:
+            return {}
+        with self._lock:
+            placeholders = ",".join("?" * len(hashes))
+            rows = self._db.execute(
+                f"SELECT hash, row FROM embeddings WHERE ready = 1 AND hash IN ({placeholders})", hashes
+            ).fetchall()
+            found = {}
+            if rows:
+                vectors = self._mapped(max(row for _, row in rows) + 1)
+                for key, row in rows:
+                    found[key] = np.array(vectors[row])
+        self.hits += len(found)
+        self.misses += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, hashes: List[str], vectors: np.ndarray):
+        with self._lock:
+            for key, vector in zip(hashes, vectors):
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO embeddings (hash, row) VALUES (?, (SELECT COALESCE(MAX(row), -1) + 1 FROM embeddings))",
+                    (key,),
+                )
+                if cursor.rowcount == 0:
+                    continue  # Another worker stored it first
+                row = self._db.execute("SELECT row FROM embeddings WHERE hash = ?", (key,)).fetchone()[0]
+                self._db.commit()
+                mapped = self._mapped(row + 1)
+                mapped[row] = vector
+                mapped.flush()
+                self._db.execute("UPDATE embeddings SET ready = 1 WHERE hash = ?", (key,))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stored = self._db.execute("SELECT COUNT(*) FROM embeddings WHERE ready = 1").fetchone()[0]
+        return {"stored_vectors": stored, "hits": self.hits, "misses": self.misses, "path": self.vectors_path}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+            self._vectors = None
+
+
+class SemanticReranker:
+    """Rerank lexical retrieval results by embedding cosine similarity.
+
+    The final score blends the BM25 score (scaled to 0-1 within the candidate
+    set) with cosine similarity to the query, weighted by ``semantic_weight``.
+    Chunk vectors are fetched from the store and only the misses are embedded.
+    """
+
+    def __init__(self, embedder: HashingEmbedder, store: EmbeddingStore, semantic_weight: float = 0.5):
+        self.embedder = embedder
+        self.store = store
+        self.semantic_weight = semantic_weight
+
+    def embed_chunks(self, texts: List[str]) -> np.ndarray:
+        hashes = [content_hash(text) for text in texts]
+        cached = self.store.get_many(hashes)
+        missing = [i for i, key in enumerate(hashes) if key not in cached]
+        if missing:
+            fresh = self.embedder.embed([texts[i] for i in missing])
+            new_hashes, new_vectors = [], []
+            for i, vector in zip(missing, fresh):
+                if hashes[i] not in cached:
+                    cached[hashes[i]] = vector
+                    new_hashes.append(hashes[i])
+                    new_vectors.append(vector)
+            self.store.put_many(new_hashes, np.asarray(new_vectors))
+        return np.stack([cached[key] for key in hashes])
+
+    def rerank(self, query: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return ``chunks`` reordered by blended score, keeping the BM25 score as ``lexical_score``"""
+        if not chunks:
+            return chunks
+        matrix = self.embed_chunks([chunk["text"] for chunk in chunks])
+        query_vector = self.embedder.embed([query])[0]
+        similarities = matrix @ query_vector
+
+        lexical = np.array([chunk.get("score", 0.0) for chunk in chunks], dtype=np.float32)
+        if lexical.max() > 0:
+            lexical = lexical / lexical.max()
+        blended = self.semantic_weight * similarities + (1 - self.semantic_weight) * lexical
+
+        for chunk, similarity, score in zip(chunks, similarities, blended):
+            chunk["lexical_score"] = chunk.get("score", 0.0)
+            chunk["semantic_score"] = float(similarity)
+            chunk["score"] = float(score)
+        return [chunks[i] for i in np.argsort(-blended, kind="stable")]
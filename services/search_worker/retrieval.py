@@ -0,0 +1,116 @@
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with a trailing plural "s" folded away"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token for English prose)"""
+    return max(1, len(text) // 4)
+
+
+def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """Split text into overlapping windows of about ``chunk_size`` characters.
+
+    Windows end on whitespace where possible so words are not cut in half.
+    """
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            boundary = max(text.rfind("\n", start + chunk_size // 2, end), text.rfind(" ", start + chunk_size // 2, end))
+            if boundary > start:
+                end = boundary
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - chunk_overlap, start + 1)
+    return chunks
+
+
+class BM25Index:
+    """In-memory Okapi BM25 over a list of passages"""
+
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(passage)) for passage in passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        document_frequency: Counter = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(passages)
+        self.idf = {
+            term: math.log(1 + (total - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_frequency.items()
+        }
+
+    def score(self, query: str) -> List[float]:
+        terms = set(tokenize(query))
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            for term in terms:
+                freq = counts.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+
+def chunk_documents(documents: List[Dict[str, Any]], chunk_size: int, chunk_overlap: int) -> List[Dict[str, Any]]:
+    """Chunk every document, tagging each chunk with its source document and position"""
+    chunks = []
+    for doc_index, doc in enumerate(documents):
+        for chunk_index, text in enumerate(chunk_text(doc.get("content", ""), chunk_size, chunk_overlap)):
+            chunks.append({"doc_index": doc_index, "chunk_index": chunk_index, "text": text})
+    return chunks
+
+
+def rank_chunks(query: str, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order chunks by BM25 score; ties keep search-rank and in-page order"""
+    scores = BM25Index([chunk["text"] for chunk in chunks]).score(query)
+    for chunk, score in zip(chunks, scores):
+        chunk["score"] = score
+    return sorted(chunks, key=lambda c: (-c["score"], c["doc_index"], c["chunk_index"]))
+
+
+def pack_chunks(ranked_chunks: List[Dict[str, Any]], token_budget: int) -> List[Dict[str, Any]]:
+    """Take the best chunks that fit in the budget (always at least one).
+
+    Chunks that share no terms with the query are only used when nothing matched.
+    """
+    selected = []
+    used = 0
+    any_match = bool(ranked_chunks) and ranked_chunks[0].get("score", 0) > 0
+    for chunk in ranked_chunks:
+        if any_match and chunk.get("score", 0) <= 0:
+            break
+        cost = estimate_tokens(chunk["text"])
+        if selected and used + cost > token_budget:
+            continue
+        selected.append(chunk)
+        used += cost
+    return selected
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SearchFn = Callable[[str, int], Awaitable[List[str]]]
+
+
+class CircuitBreaker:
+    """Skip a backend for a cool-down period after repeated consecutive failures.
+
+    Closed: calls pass through. After ``failure_threshold`` consecutive failures
+    the breaker opens and calls are skipped for ``cooldown_secs``. It then goes
+    half-open and lets one trial call through; success closes it again, failure
+    re-opens it for another cool-down.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown_secs: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_secs = cooldown_secs
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_secs:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_abandoned(self):
+        """A call cancelled by its caller says nothing about the backend's health"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class SearchProvider:
+    """A search backend wrapped with a circuit breaker and latency/health stats"""
+
+    def __init__(self, name: str, search_fn: SearchFn, breaker: CircuitBreaker):
+        self.name = name
+        self.search_fn = search_fn
+        self.breaker = breaker
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.latency_ewma_ms: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _record_latency(self, started: float):
+        latency_ms = (time.monotonic() - started) * 1000
+        self.last_latency_ms = round(latency_ms, 1)
+        if self.latency_ewma_ms is None:
+            self.latency_ewma_ms = latency_ms
+        else:
+            self.latency_ewma_ms = 0.8 * self.latency_ewma_ms + 0.2 * latency_ms
+
+    async def search(self, query: str, max_results: int) -> List[str]:
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            urls = await self.search_fn(query, max_results)
+        except asyncio.CancelledError:
+            # Lost the hedge race, or the request went away; only free a half-open trial
+            self.cancelled += 1
+            self.breaker.record_abandoned()
+            raise
+        except Exception as e:
+            self._record_latency(started)
+            self.failures += 1
+            self.last_error = str(e)
+            self.breaker.record_failure()
+            raise
+        self._record_latency(started)
+        self.successes += 1
+        self.breaker.record_success()
+        return urls
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "latency_ewma_ms": round(self.latency_ewma_ms, 1) if self.latency_ewma_ms is not None else None,
+            "last_latency_ms": self.last_latency_ms,
+            "last_error": self.last_error,
+        }
+
+
+class HedgedSearch:
+    """Query search providers in priority order with hedging.
+
+    The first available provider starts immediately. Each following provider
+    starts once the previous one has been running for ``hedge_delay`` seconds,
+    or straight away if it fails. When the first provider answers, the others
+    get ``merge_window`` more seconds to contribute. Anything still running then,
+    or at ``deadline``, is cancelled. URLs from all answers are interleaved by
+    rank and deduplicated.
+    """
+
+    def __init__(self, providers: List[SearchProvider], hedge_delay: float, merge_window: float, deadline: float):
+        self.providers = providers
+        self.hedge_delay = hedge_delay
+        self.merge_window = merge_window
+        self.deadline = deadline
+
+    async def search(self, query: str, max_results: int) -> List[str]:
+        """Return merged URLs, or raise if every available provider failed"""
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        waiting = list(self.providers)
+        running: Dict[asyncio.Task, SearchProvider] = {}
+        results: Dict[str, List[str]] = {}
+        errors: Dict[str, str] = {}
+        next_launch_at = loop.time()
+        merge_until: Optional[float] = None
+
+        try:
+            while waiting or running:
+                now = loop.time()
+                if waiting and now >= next_launch_at:
+                    provider = waiting.pop(0)
+                    # Only consult the breaker at launch so a half-open trial is never reserved and unused
+                    if not provider.breaker.allow():
+                        provider.skipped += 1
+                        errors[provider.name] = f"circuit {provider.breaker.state}"
+                        logger.info("Search provider skipped", extra={"provider": provider.name, "circuit": provider.breaker.state})
+                        continue
+                    running[asyncio.create_task(provider.search(query, max_results))] = provider
+                    next_launch_at = now + self.hedge_delay
+                    continue
+
+                # Sleep until something finishes, the next hedge fires, or time is up
+                wake_at = deadline_at if merge_until is None else min(deadline_at, merge_until)
+                if waiting and merge_until is None:
+                    wake_at = min(wake_at, next_launch_at)
+                if now >= wake_at:
+                    break
+                if not running:
+                    await asyncio.sleep(wake_at - now)
+                    continue
+
+                done, _ = await asyncio.wait(running, timeout=wake_at - now, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None and task.result():
+                        results[provider.name] = task.result()
+                        logger.info("Search provider answered", extra={"provider": provider.name, "urls": len(task.result())})
+                        if merge_until is None:
+                            merge_until = loop.time() + self.merge_window
+                            waiting.clear()
+                    else:
+                        errors[provider.name] = str(task.exception()) if task.exception() else "no results"
+                        logger.warning("Search provider failed", extra={"provider": provider.name, "error": errors[provider.name]})
+                        # A failure triggers the next hedge immediately
+                        next_launch_at = loop.time()
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        if not results:
+            raise RuntimeError(f"All search providers failed: {errors or 'deadline exceeded'}")
+
+        # Interleave by rank in provider priority order and drop duplicates
+        ranked = [results[p.name] for p in self.providers if p.name in results]
+        merged, seen = [], set()
+        for rank in range(max(len(urls) for urls in ranked)):
+            for urls in ranked:
+                if rank < len(urls) and urls[rank] not in seen:
+                    seen.add(urls[rank])
+                    merged.append(urls[rank])
+        return merged[:max_results]
+
+    def stats(self) -> Dict[str, Any]:
+        return {provider.name: provider.stats() for provider in self.providers}
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesce concurrent work that shares a key.
+
+    The first caller for a key (the leader) starts the work as its own task;
+    callers arriving while it is in flight (followers) await the same task.
+    Waiters are shielded from each other, so a leader whose client disconnects
+    does not cancel the work its followers are waiting on.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` for ``key`` unless an identical call is already in flight"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.followers += 1
+            logger.info("Joining in-flight work", extra={"flight": self.name, "key": key})
+            return await asyncio.shield(future)
+
+        self.leaders += 1
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return await asyncio.shield(future)
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], Dict[Hashable, asyncio.Future]]:
+        """Split keys into those the caller now owns and those already in flight.
+
+        The caller must ``resolve`` every owned key (with ``None`` on failure),
+        otherwise followers waiting on it will hang until their deadline.
+        """
+        owned, shared = [], {}
+        loop = asyncio.get_running_loop()
+        for key in keys:
+            if key in self._inflight:
+                shared[key] = self._inflight[key]
+                self.followers += 1
+            elif key not in owned:
+                self._inflight[key] = loop.create_future()
+                owned.append(key)
+                self.leaders += 1
+        return owned, shared
+
+    def resolve(self, key: Hashable, value: Any):
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(value)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception retrieved when every waiter has gone away
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "followers": self.followers}
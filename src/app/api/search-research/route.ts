@@ -1,4 +1,5 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { workerProxyHeaders } from '@/lib/workerIdentity';
 
 // Types for request/response data
 interface SearchRequest {
@@ -87,7 +88,8 @@ export async function POST(request: NextRequest) {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'User-Agent': 'NextJS-API-Bridge/1.0'
+          'User-Agent': 'NextJS-API-Bridge/1.0',
+          ...(await workerProxyHeaders(request))
         },
         body: JSON.stringify(workerRequest)
       }),
@@ -99,6 +101,18 @@ export async function POST(request: NextRequest) {
       const errorText = await workerResponse.text();
       console.error(`[API] Python worker error (${workerResponse.status}):`, errorText);
       
+      if (workerResponse.status === 429) {
+        // Per-user rate limit or full queue on the worker: let the client back off as told
+        const retryAfter = workerResponse.headers.get('Retry-After');
+        return NextResponse.json<ErrorResponse>(
+          { 
+            error: 'Too many research requests',
+            details: 'Please wait before starting another research request'
+          },
+          { status: 429, headers: retryAfter ? { 'Retry-After': retryAfter } : undefined }
+        );
+      }
+      
       if (workerResponse.status === 404) {
         return NextResponse.json<ErrorResponse>(
           { 
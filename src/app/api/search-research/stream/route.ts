@@ -0,0 +1,68 @@
+import { NextRequest } from 'next/server';
+import { workerProxyHeaders } from '@/lib/workerIdentity';
+
+// Environment configuration
+const PYTHON_WORKER_URL = process.env.PYTHON_WORKER_URL || 'http://localhost:8000';
+
+// Proxies the Python worker's /research/stream Server-Sent Events endpoint.
+// Events: urls, document, citations, token, done, error.
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json();
+
+    if (typeof body?.query !== 'string' || body.query.trim().length === 0) {
+      return new Response(
+        JSON.stringify({ error: 'Invalid request format', details: 'Request must include a valid query string' }),
+        { status: 400, headers: { 'Content-Type': 'application/json' } }
+      );
+    }
+
+    const workerResponse = await fetch(`${PYTHON_WORKER_URL}/research/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'User-Agent': 'NextJS-API-Bridge/1.0',
+        ...(await workerProxyHeaders(request))
+      },
+      body: JSON.stringify({ query: body.query, max_results: body.max_results ?? 10 }),
+      // Abort the worker pipeline when the browser goes away
+      signal: request.signal
+    });
+
+    if (workerResponse.status === 429) {
+      // Per-user rate limit or full queue on the worker: pass it through with its Retry-After
+      const retryAfter = workerResponse.headers.get('Retry-After');
+      return new Response(
+        JSON.stringify({ error: 'Too many research requests', details: 'Please wait before starting another research request' }),
+        {
+          status: 429,
+          headers: { 'Content-Type': 'application/json', ...(retryAfter ? { 'Retry-After': retryAfter } : {}) }
+        }
+      );
+    }
+
+    if (!workerResponse.ok || !workerResponse.body) {
+      console.error(`[API] Python worker stream error (${workerResponse.status})`);
+      return new Response(
+        JSON.stringify({ error: 'Research service temporarily unavailable' }),
+        { status: 503, headers: { 'Content-Type': 'application/json' } }
+      );
+    }
+
+    // Pass the event stream through untouched so the first bytes reach the client immediately
+    return new Response(workerResponse.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+      },
+    });
+
+  } catch (error) {
+    console.error('[API] Unexpected error in search-research stream route:', error);
+    return new Response(
+      JSON.stringify({ error: error instanceof Error ? error.message : 'Internal server error' }),
+      { status: 500, headers: { 'Content-Type': 'application/json' } }
+    );
+  }
+}
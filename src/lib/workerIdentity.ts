@@ -0,0 +1,24 @@
+import { auth } from '@clerk/nextjs/server';
+import { getClientIP } from '@/lib/ratelimit';
+
+/**
+ * Per-user identity for the Python research worker's rate limiter (sent as X-Client-ID).
+ * Signed-in users are keyed by their Clerk user ID, anyone else by their IP address;
+ * without it every request would share the Next.js server's own address.
+ */
+export async function workerClientId(request: Request): Promise<string> {
+  const { userId } = await auth();
+  return userId ? `user:${userId}` : `ip:${getClientIP(request)}`;
+}
+
+/**
+ * Headers that let the worker trust X-Client-ID. The worker only honours it from
+ * its TRUSTED_PROXY_IPS or when PYTHON_WORKER_PROXY_SECRET matches its PROXY_SHARED_SECRET.
+ */
+export async function workerProxyHeaders(request: Request): Promise<Record<string, string>> {
+  const secret = process.env.PYTHON_WORKER_PROXY_SECRET;
+  return {
+    'X-Client-ID': await workerClientId(request),
+    ...(secret ? { 'X-Proxy-Secret': secret } : {})
+  };
+}